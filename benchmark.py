@@ -0,0 +1,405 @@
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import PIL
+from PIL import Image, ImageDraw
+
+from comic_archive import ComicFile, DEFAULT_PDF_DPI, natural_sort_key
+from profiling import memory_usage
+from viewport import BASE_PAGE_WIDTH
+
+DEFAULT_PAGES = 24
+DEFAULT_PAGE_SIZE = (1988, 3056)  # A common full-page scan size
+DEFAULT_FORMAT = "jpeg"
+DEFAULT_QUALITY = 90
+DEFAULT_REPEAT = 5
+DEFAULT_SORT_NAMES = 100000
+DEFAULT_THRESHOLD = 0.10  # Slowdown that compare reports as a regression
+DEFAULT_SEED = 1
+RESULTS_VERSION = 1
+THUMB_SIZE = (100, 150)  # The viewer's thumbnail box
+PAGE_FORMATS = {"jpeg": ".jpg", "png": ".png"}
+KINDS = ("cbz-stored", "cbz-deflated", "cbr", "pdf")
+BENCHMARKS = ("open", "page", "thumbnail", "pdf_convert", "sort")
+
+
+def synthetic_page(number, size, seed):
+    """A comic-like page: panels of gradients, shapes and line work over paper noise, so it encodes like a scan."""
+    rng = random.Random(seed * 100003 + number)
+    width, height = size
+    img = Image.merge("RGB", [Image.effect_noise(size, 18).point(lambda v, base=base: v + base - 128)
+                              for base in (236, 230, 214)])
+    draw = ImageDraw.Draw(img)
+    margin = width // 24
+    rows = rng.randint(2, 4)
+    row_height = (height - margin * (rows + 1)) // rows
+    for row in range(rows):
+        top = margin + row * (row_height + margin)
+        columns = rng.randint(1, 3)
+        column_width = (width - margin * (columns + 1)) // columns
+        for column in range(columns):
+            left = margin + column * (column_width + margin)
+            box = (left, top, left + column_width, top + row_height)
+            colors = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(2)]
+            gradient = Image.linear_gradient("L").resize((column_width, row_height))
+            img.paste(Image.composite(Image.new("RGB", gradient.size, colors[0]),
+                                      Image.new("RGB", gradient.size, colors[1]), gradient), box[:2])
+            for _ in range(rng.randint(4, 12)):
+                x0, y0 = rng.randint(box[0], box[2]), rng.randint(box[1], box[3])
+                x1, y1 = rng.randint(x0, box[2]), rng.randint(y0, box[3])
+                shape = draw.ellipse if rng.random() < 0.5 else draw.rectangle
+                shape((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)), outline="black",
+                      width=max(1, width // 400))
+            for _ in range(rng.randint(10, 30)):
+                draw.line([(rng.randint(box[0], box[2]), rng.randint(box[1], box[3])) for _ in range(2)],
+                          fill="black", width=max(1, width // 600))
+            draw.rectangle(box, outline="black", width=max(2, width // 200))
+    return img
+
+
+def encode_page(img, page_format, quality=DEFAULT_QUALITY):
+    buffer = io.BytesIO()
+    if page_format == "jpeg":
+        img.save(buffer, "JPEG", quality=quality)
+    else:
+        img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def corpus_path(directory, kind, pages, size, page_format):
+    stem = f"synthetic_{pages}p_{size[0]}x{size[1]}_{page_format}"
+    if kind in ("cbz-stored", "cbz-deflated"):
+        return os.path.join(directory, f"{stem}_{kind.split('-')[1]}.cbz")
+    if kind in ("cbr", "pdf"):
+        return os.path.join(directory, f"{stem}.{kind}")
+    raise ValueError(f"Unknown corpus kind: {kind}")
+
+
+def generate_corpus(directory, pages=DEFAULT_PAGES, size=DEFAULT_PAGE_SIZE, page_format=DEFAULT_FORMAT,
+                    kinds=KINDS, seed=DEFAULT_SEED):
+    """Write one synthetic comic per kind into directory, reusing files already there; returns {kind: path}.
+
+    CBR needs the rar tool and is skipped without it."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {kind: corpus_path(directory, kind, pages, size, page_format) for kind in kinds}
+    missing = [kind for kind, path in paths.items() if not os.path.exists(path)]
+    if not missing:
+        return paths
+    rar_tool = shutil.which("rar")
+    if "cbr" in missing and rar_tool is None:
+        logging.warning("Skipping CBR: the rar tool is not installed")
+        missing.remove("cbr")
+        del paths["cbr"]
+    extension = PAGE_FORMATS[page_format]
+    page_dir = tempfile.mkdtemp(prefix="spinner_rack_bench_")
+    try:
+        names = []
+        for number in range(1, pages + 1):
+            name = f"page_{number:03d}{extension}"
+            with open(os.path.join(page_dir, name), "wb") as f:
+                f.write(encode_page(synthetic_page(number, size, seed), page_format))
+            names.append(name)
+        for kind in missing:
+            # Written under a temporary name so an interrupted run never leaves a partial file to be reused
+            path = paths[kind]
+            temp_path = path + ".part" + os.path.splitext(path)[1]
+            if kind == "cbr":
+                subprocess.run([rar_tool, "a", "-ep", "-inul", temp_path] + names, cwd=page_dir, check=True)
+            elif kind == "pdf":
+                # Appending a page at a time keeps one decoded page in memory instead of all of them
+                for number, name in enumerate(names):
+                    with Image.open(os.path.join(page_dir, name)) as img:
+                        img.convert("RGB").save(temp_path, "PDF", resolution=DEFAULT_PDF_DPI * 3, append=number > 0)
+            else:
+                method = zipfile.ZIP_STORED if kind == "cbz-stored" else zipfile.ZIP_DEFLATED
+                with zipfile.ZipFile(temp_path, "w", method) as archive:
+                    for name in names:
+                        archive.write(os.path.join(page_dir, name), name)
+            os.replace(temp_path, path)
+    finally:
+        shutil.rmtree(page_dir, ignore_errors=True)
+    return paths
+
+
+def sort_names(count, seed=DEFAULT_SEED):
+    """Shuffled page names across many folders, with the mixed digit runs that natural sorting has to split."""
+    rng = random.Random(seed)
+    names = [f"Series {volume % 7} v{volume:02d}/Issue #{issue}/page_{page}{rng.choice(('', 'a', 'b'))}.jpg"
+             for volume, issue, page in ((i // 5000, (i // 100) % 50, i % 100) for i in range(count))]
+    rng.shuffle(names)
+    return names
+
+
+def bench_open(path, repeat, **options):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        comic = ComicFile(path)
+        times.append(time.perf_counter() - start)
+        comic.close()
+    return times, 1
+
+
+def bench_page(path, repeat, width=BASE_PAGE_WIDTH, **options):
+    """Decode and LANCZOS resize every page to the display width, as show_page does on a cache miss."""
+    comic = ComicFile(path)
+    try:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for name in comic.image_files:
+                img = comic.load_page(name, width)  # PDFs rasterize straight to the width
+                if img.width != width:
+                    img = img.resize((width, int(width * img.height / img.width)), Image.LANCZOS)
+            times.append(time.perf_counter() - start)
+        return times, len(comic.image_files)
+    finally:
+        comic.close()
+
+
+def bench_thumbnail(path, repeat, **options):
+    """Draft-decode and fit every page into the thumbnail box, as the sidebar does."""
+    comic = ComicFile(path)
+    try:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for name in comic.image_files:
+                img = comic.load_page(name, THUMB_SIZE[0], draft_size=THUMB_SIZE)
+                aspect_ratio = img.width / img.height
+                if aspect_ratio > THUMB_SIZE[0] / THUMB_SIZE[1]:
+                    thumb_size = (THUMB_SIZE[0], int(THUMB_SIZE[0] / aspect_ratio))
+                else:
+                    thumb_size = (int(THUMB_SIZE[1] * aspect_ratio), THUMB_SIZE[1])
+                img.resize(thumb_size, Image.LANCZOS)
+            times.append(time.perf_counter() - start)
+        return times, len(comic.image_files)
+    finally:
+        comic.close()
+
+
+def bench_pdf_convert(path, repeat, **options):
+    """Convert a whole PDF at the viewer's DPI in one poppler run, the way PDFs were opened before on-demand pages."""
+    from pdf2image import convert_from_path
+    from comic_archive import default_poppler_path
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = convert_from_path(path, dpi=DEFAULT_PDF_DPI, poppler_path=default_poppler_path())
+        times.append(time.perf_counter() - start)
+    return times, len(pages)
+
+
+def bench_sort(path, repeat, sort_count=DEFAULT_SORT_NAMES, seed=DEFAULT_SEED, **options):
+    names = sort_names(sort_count, seed)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sorted(names, key=natural_sort_key)
+        times.append(time.perf_counter() - start)
+    return times, len(names)
+
+
+BENCHMARK_FUNCTIONS = {
+    "open": bench_open,
+    "page": bench_page,
+    "thumbnail": bench_thumbnail,
+    "pdf_convert": bench_pdf_convert,
+    "sort": bench_sort,
+}
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None where it isn't available."""
+    try:
+        # VmHWM starts afresh at exec; ru_maxrss on Linux carries over the parent's peak from before the fork
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(benchmark, path, repeat, options):
+    """Child-process entry point: run one benchmark and measure its own peak memory."""
+    baseline = memory_usage()
+    times, items = BENCHMARK_FUNCTIONS[benchmark](path, repeat, **options)
+    return {"times": times, "items": items, "baseline_rss_bytes": baseline, "peak_rss_bytes": peak_rss()}
+
+
+def summarize(case):
+    times = case["times"]
+    median = statistics.median(times)
+    case.update({
+        "min": min(times),
+        "median": median,
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "median_per_item": median / case["items"] if case["items"] else None,
+    })
+    return case
+
+
+def cases_for(benchmarks, corpus):
+    """(benchmark, kind, path) for every benchmark that applies to a comic in the corpus."""
+    for benchmark in benchmarks:
+        if benchmark == "sort":
+            yield benchmark, None, None
+            continue
+        for kind, path in sorted(corpus.items()):
+            if benchmark == "pdf_convert" and kind != "pdf":
+                continue  # Whole-file conversion is a PDF path only; PDFs get open, page and thumbnail too
+            yield benchmark, kind, path
+
+
+def run_benchmarks(corpus, benchmarks=BENCHMARKS, repeat=DEFAULT_REPEAT, options=None, progress=None):
+    """Time each case in a fresh process so peak memory is its own; returns the results document."""
+    options = options or {}
+    results = {}
+    context = get_context("spawn")  # Nothing inherited from earlier cases, on every platform
+    for benchmark, kind, path in cases_for(benchmarks, corpus):
+        key = f"{benchmark}/{kind}" if kind else benchmark
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                case = executor.submit(run_case, benchmark, path, repeat, options).result()
+            except Exception as e:
+                logging.warning("Skipping %s: %s", key, str(e))
+                results[key] = {"skipped": str(e)}
+                continue
+        case.update({"benchmark": benchmark, "kind": kind, "file": os.path.basename(path) if path else None})
+        results[key] = summarize(case)
+        if progress is not None:
+            progress(key, results[key])
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+        },
+        "repeat": repeat,
+        "options": options,
+        "results": results,
+    }
+
+
+def compare_results(old, new, threshold=DEFAULT_THRESHOLD):
+    """Rows of (key, old, new, ratio, verdict) for cases present in both result documents.
+
+    Medians are compared per item (page, name sorted), so runs over corpora of different lengths still line up."""
+    rows = []
+    for key in sorted(set(old["results"]) & set(new["results"])):
+        before = old["results"][key].get("median_per_item")
+        after = new["results"][key].get("median_per_item")
+        if before is None or after is None:
+            continue
+        ratio = after / before if before else float("inf")
+        if ratio > 1 + threshold:
+            verdict = "slower"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append((key, before, after, ratio, verdict))
+    return rows
+
+
+def format_bytes(value):
+    return f"{value / 1048576:.0f} MB" if value is not None else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Spinner Rack benchmarks over a synthetic comic corpus")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="write a synthetic corpus")
+    generate_parser.add_argument("directory")
+    run_parser = commands.add_parser("run", help="generate or reuse a corpus and time the core paths")
+    run_parser.add_argument("--corpus", help="directory to generate the corpus in and reuse between runs")
+    run_parser.add_argument("--output", help="write the machine-readable results to this JSON file")
+    run_parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed passes per case")
+    run_parser.add_argument("--width", type=int, default=BASE_PAGE_WIDTH, help="display width for the page case")
+    run_parser.add_argument("--sort-count", type=int, default=DEFAULT_SORT_NAMES, help="names to sort")
+    for command_parser in (generate_parser, run_parser):
+        command_parser.add_argument("--pages", type=int, default=DEFAULT_PAGES)
+        command_parser.add_argument("--page-width", type=int, default=DEFAULT_PAGE_SIZE[0])
+        command_parser.add_argument("--page-height", type=int, default=DEFAULT_PAGE_SIZE[1])
+        command_parser.add_argument("--format", choices=sorted(PAGE_FORMATS), default=DEFAULT_FORMAT)
+        command_parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+        command_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="relative change in the median reported as slower or faster")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.command == "compare":
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        rows = compare_results(old, new, args.threshold)
+        print(f"{'case':<28}{'old ms/item':>12}{'new ms/item':>12}{'ratio':>8}")
+        for key, before, after, ratio, verdict in rows:
+            print(f"{key:<28}{before * 1000:>12.3f}{after * 1000:>12.3f}{ratio:>8.2f}  {verdict}")
+        if any(verdict == "slower" for *_, verdict in rows):
+            sys.exit(1)
+        return
+
+    size = (args.page_width, args.page_height)
+    if args.command == "generate":
+        for kind, path in generate_corpus(args.directory, args.pages, size, args.format, args.kinds, args.seed).items():
+            print(f"{kind}: {path}")
+        return
+
+    corpus_dir = args.corpus or tempfile.mkdtemp(prefix="spinner_rack_corpus_")
+    try:
+        needs_corpus = any(benchmark != "sort" for benchmark in args.benchmarks)
+        corpus = generate_corpus(corpus_dir, args.pages, size, args.format, args.kinds, args.seed) if needs_corpus else {}
+        options = {"width": args.width, "sort_count": args.sort_count, "seed": args.seed}
+
+        def progress(key, case):
+            if case.get("median_per_item") is not None:
+                print(f"{key:<28}{case['median'] * 1000:>10.1f} ms{case['median_per_item'] * 1000:>10.2f} ms/item"
+                      f"  peak {format_bytes(case['peak_rss_bytes'])}", flush=True)
+
+        results = run_benchmarks(corpus, args.benchmarks, args.repeat, options, progress)
+        results["corpus"] = {"pages": args.pages, "page_size": list(size), "format": args.format,
+                             "seed": args.seed, "files": {kind: os.path.basename(path) for kind, path in corpus.items()}}
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if args.corpus is None:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
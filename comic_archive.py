@@ -0,0 +1,485 @@
+import io
+import json
+import logging
+import mmap
+import os
+import queue
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+DEFAULT_PDF_DPI = 100
+MAX_PDF_RENDERS = 2  # Concurrent poppler processes per open PDF
+STREAM_CHUNK_SIZE = 1024 * 1024
+DEFAULT_POOL_SIZE = 4
+COMIC_EXTENSIONS = ('.cbz', '.cbr', '.pdf')
+REMOTE_SCHEMES = ('http', 'https')
+ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")  # Signature, then file name and extra field lengths
+FAST_CBZ_DIR = ".spinner/"  # Transcoder extras inside a fast CBZ; never pages themselves
+FAST_CBZ_INDEX = FAST_CBZ_DIR + "index.json"
+FAST_CBZ_VERSION = 1
+COMIC_INFO_FIELDS = [
+    "Title", "Series", "Number", "Volume", "Writer", "Penciller",
+    "Inker", "Colorist", "Letterer", "Editor", "Publisher", "Genre",
+    "Summary"
+]
+
+
+def rar_backend():
+    """The rarfile module, imported on first use so start-up and CBZ/PDF opens never pay for it."""
+    import rarfile
+    return rarfile
+
+
+def is_remote(path):
+    """Whether a comic path is an HTTP(S) URL, read through remote_archive rather than the file system."""
+    return urlsplit(str(path)).scheme.lower() in REMOTE_SCHEMES
+
+
+def natural_sort_key(s):
+    return [int(c) if c.isdigit() else c.lower() for c in re.split(r'(\d+)', s)]
+
+
+def filter_image_files(all_files, file_extension):
+    """Pick the page images out of an archive listing, in reading order."""
+    image_files = [f for f in all_files if f.lower().endswith(('jpg', 'jpeg', 'png')) and not f.startswith(FAST_CBZ_DIR)]
+    if file_extension.lower() == '.cbr':
+        image_files = [f for f in image_files if re.search(r'\d+', f)]
+    return sorted(image_files, key=natural_sort_key)
+
+
+def comic_info_fields(xml_content):
+    """Map the known ComicInfo.xml fields to their text; raises ET.ParseError on bad XML."""
+    root = ET.fromstring(xml_content)
+    fields = {}
+    for field in COMIC_INFO_FIELDS:
+        value = root.find(field)
+        if value is not None and value.text:
+            fields[field] = value.text
+    return fields
+
+
+def read_fast_index(archive):
+    """Page index embedded by transcode.py, or None when the archive is not a usable fast CBZ."""
+    try:
+        index = json.loads(archive.read(FAST_CBZ_INDEX))
+    except KeyError:
+        return None
+    except (ValueError, zipfile.BadZipFile) as e:
+        logging.error("Ignoring unreadable %s: %s", FAST_CBZ_INDEX, str(e))
+        return None
+    if index.get("version") != FAST_CBZ_VERSION:
+        return None
+    return index
+
+
+def read_comic_metadata(file_path):
+    """Headless summary of a comic file: page count, cover page and ComicInfo fields."""
+    file_extension = os.path.splitext(file_path)[1].lower()
+    if file_extension == '.pdf':
+        document = PdfDocument(file_path)
+        return {"page_count": document.page_count, "cover_page": document.page_names[0] if document.page_names else None,
+                "fields": {}}
+    if file_extension == '.cbz':
+        archive = zipfile.ZipFile(file_path, 'r')
+    elif file_extension == '.cbr':
+        archive = rar_backend().RarFile(file_path)
+    else:
+        raise RuntimeError(f"Unsupported comic file type: {file_extension}")
+    with archive:
+        all_files = archive.namelist()
+        # A fast CBZ lists its pages in reading order already, so the scanner can skip filtering and sorting
+        fast_index = read_fast_index(archive) if FAST_CBZ_INDEX in all_files else None
+        if fast_index is not None:
+            image_files = [page["name"] for page in fast_index["pages"]]
+        else:
+            image_files = filter_image_files(all_files, file_extension)
+        fields = {}
+        if "ComicInfo.xml" in all_files:
+            try:
+                fields = comic_info_fields(archive.read("ComicInfo.xml").decode('utf-8', errors='ignore'))
+            except ET.ParseError as e:
+                logging.error("Failed to parse ComicInfo.xml in %s: %s", file_path, str(e))
+    return {"page_count": len(image_files), "cover_page": image_files[0] if image_files else None, "fields": fields}
+
+
+def default_poppler_path():
+    if os.name == 'nt':  # Windows
+        return r'C:\poppler\Library\bin'  # Adjust for your Windows path
+    return '/usr/bin'  # Default Linux path for poppler-utils
+
+
+class PdfDocument:
+    """PDF page source that renders single pages on demand at the size they are needed."""
+
+    def __init__(self, file_path, poppler_path=None, max_renders=MAX_PDF_RENDERS):
+        from pdf2image import pdfinfo_from_path  # Imported on first PDF open
+        self.file_path = file_path
+        self.poppler_path = poppler_path or default_poppler_path()
+        info = pdfinfo_from_path(file_path, poppler_path=self.poppler_path)
+        self.page_count = int(info["Pages"])
+        self.page_names = [f"page_{i:04d}.png" for i in range(1, self.page_count + 1)]
+        self.page_numbers = {name: i for i, name in enumerate(self.page_names, start=1)}
+        # "612 x 792 pts (letter)": the first page's size, enough for fit modes to size a page before rendering it
+        size = re.match(r"([\d.]+) x ([\d.]+)", str(info.get("Page size", "")))
+        self.page_size = (float(size.group(1)), float(size.group(2))) if size else None
+        self.render_slots = threading.BoundedSemaphore(max_renders)
+        logging.debug("PDF %s has %d pages", file_path, self.page_count)
+
+    def namelist(self):
+        return list(self.page_names)
+
+    def render(self, name, target_width=None, dpi=DEFAULT_PDF_DPI):
+        """Render one page, scaled straight to target_width when given."""
+        from pdf2image import convert_from_path
+        page_number = self.page_numbers[name]
+        with self.render_slots:
+            start_time = time.time()
+            pages = convert_from_path(
+                self.file_path,
+                poppler_path=self.poppler_path,
+                dpi=dpi,
+                first_page=page_number,
+                last_page=page_number,
+                size=(target_width, None) if target_width else None,
+            )
+            logging.debug("Rendered PDF page %d in %.2f seconds", page_number, time.time() - start_time)
+        if not pages:
+            raise RuntimeError(f"PDF page {page_number} did not render")
+        return pages[0]
+
+    def close(self):
+        pass
+
+
+def verify_archive(file_path):
+    """Check every member's CRC; return the first bad member name or None."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.cbz':
+        with zipfile.ZipFile(file_path) as archive:
+            return archive.testzip()
+    if extension == '.cbr':
+        rarfile = rar_backend()
+        with rarfile.RarFile(file_path) as archive:
+            try:
+                archive.testrar()
+            except rarfile.Error as e:
+                return str(e)
+        return None
+    raise RuntimeError(f"Verification is not supported for {extension} files")
+
+
+def is_solid_rar(rar):
+    """Solid archives mark every member after the first with RAR_FILE_SOLID."""
+    return any(info.flags & rar_backend().RAR_FILE_SOLID for info in rar.infolist())
+
+
+class SolidRarArchive:
+    """Solid RAR reader that decompresses the archive once, in order, into a temporary page store."""
+
+    def __init__(self, rar):
+        self.rar = rar
+        self.members = [info for info in rar.infolist() if not info.is_dir()]
+        self.store_dir = tempfile.mkdtemp(prefix="spinner_rack_rar_")
+        self.stored = {}
+        self.done = False
+        self.closed = False
+        self.process = None
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._stream_members, name="solid-rar", daemon=True)
+        self.thread.start()
+
+    def namelist(self):
+        return self.rar.namelist()
+
+    def _stream_members(self):
+        try:
+            if self.rar.needs_password():
+                raise RuntimeError("password protected archives are read member by member")
+            # Unrar restarts a solid stream for every member it is asked for, so print them all in one
+            # pass and split the output by the member sizes from the archive headers. Started under the
+            # condition so close() either sees the process to kill or stops it from starting.
+            with self.condition:
+                if self.closed:
+                    return
+                self.process = subprocess.Popen(
+                    [rar_backend().UNRAR_TOOL, "p", "-inul", "-p-", self.rar.filename],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            for index, info in enumerate(self.members):
+                path = os.path.join(self.store_dir, f"{index:05d}")
+                remaining = info.file_size
+                with open(path, "wb") as member_file:
+                    while remaining > 0:
+                        chunk = self.process.stdout.read(min(remaining, STREAM_CHUNK_SIZE))
+                        if not chunk:
+                            raise RuntimeError(f"archive stream ended inside {info.filename}")
+                        member_file.write(chunk)
+                        remaining -= len(chunk)
+                with self.condition:
+                    self.stored[info.filename] = path
+                    self.condition.notify_all()
+            self.process.stdout.close()
+            self.process.wait()
+            logging.debug("Solid RAR %s streamed in one pass", self.rar.filename)
+        except Exception as e:
+            if not self.closed:
+                logging.warning("Sequential extraction of %s failed, reading members individually: %s",
+                                self.rar.filename, str(e))
+            if self.process is not None and self.process.poll() is None:
+                self.process.kill()
+        finally:
+            with self.condition:
+                self.done = True
+                self.condition.notify_all()
+
+    def open(self, name):
+        with self.condition:
+            self.condition.wait_for(lambda: name in self.stored or self.done or self.closed)
+            path = self.stored.get(name)
+        if path is None:
+            return self.rar.open(name)
+        return open(path, "rb")
+
+    def read(self, name):
+        with self.open(name) as member_file:
+            return member_file.read()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+        self.thread.join()
+        self.rar.close()
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+
+class ArchivePool:
+    """Pool of independent handles over one archive so concurrent page reads don't share a file position."""
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE):
+        self.factory = factory
+        self.slots = threading.BoundedSemaphore(max(1, size))
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.handles = []
+        self.closed = False
+
+    @contextmanager
+    def handle(self):
+        self.slots.acquire()
+        try:
+            try:
+                archive = self.idle.get_nowait()
+            except queue.Empty:
+                archive = self.factory()
+                with self.lock:
+                    if self.closed:
+                        archive.close()
+                        raise RuntimeError("Archive pool is closed")
+                    self.handles.append(archive)
+            try:
+                yield archive
+            finally:
+                self.idle.put(archive)
+        finally:
+            self.slots.release()
+
+    def read(self, name):
+        with self.handle() as archive:
+            return archive.read(name)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            handles, self.handles = self.handles, []
+        for archive in handles:
+            archive.close()
+
+
+class MemberView(io.RawIOBase):
+    """Seekable read-only file over a memoryview, so Pillow reads a page straight out of the mapping."""
+
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self.view) - self.position)
+        if count <= 0:
+            return 0
+        buffer[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def readall(self):
+        data = bytes(self.view[self.position:])
+        self.position = len(self.view)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self.position = offset
+        return offset
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        if not self.closed:
+            self.view.release()
+        super().close()
+
+
+class MappedZipFile:
+    """CBZ reader that memory-maps the archive once and serves stored members as zero-copy views.
+
+    Deflated and encrypted members fall back to a pool of ordinary ZipFile handles. Views are safe to
+    read from any thread, and every process mapping the same file shares the OS page cache."""
+
+    def __init__(self, file_path, pool_size=DEFAULT_POOL_SIZE):
+        self.filename = file_path
+        self.zip = zipfile.ZipFile(file_path, 'r')
+        self.pool = ArchivePool(lambda: zipfile.ZipFile(file_path, 'r'), pool_size)
+        self.data_offsets = {}
+        with open(file_path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def namelist(self):
+        return self.zip.namelist()
+
+    def getinfo(self, name):
+        return self.zip.getinfo(name)
+
+    def member_view(self, name):
+        """CRC-checked memoryview of a stored member's bytes, or None if it has to be decompressed."""
+        info = self.zip.getinfo(name)
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+            return None
+        start = self.data_offsets.get(name)
+        if start is None:
+            # The local header's name and extra lengths can differ from the central directory's
+            signature, name_length, extra_length = ZIP_LOCAL_HEADER.unpack_from(self.map, info.header_offset)
+            if signature != b"PK\x03\x04":
+                raise zipfile.BadZipFile(f"Bad local header for {name!r}")
+            start = info.header_offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+            self.data_offsets[name] = start
+        if start + info.file_size > len(self.map):
+            raise zipfile.BadZipFile(f"Truncated member {name!r}")
+        with memoryview(self.map) as whole:
+            view = whole[start:start + info.file_size]
+        if zlib.crc32(view) != info.CRC:
+            view.release()
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {name!r}")
+        return view
+
+    def open(self, name):
+        view = self.member_view(name)
+        if view is None:
+            return io.BytesIO(self.pool.read(name))
+        return MemberView(view)
+
+    def read(self, name):
+        view = self.member_view(name)
+        if view is None:
+            return self.pool.read(name)
+        with view:
+            return bytes(view)
+
+    def close(self):
+        self.pool.close()
+        self.zip.close()
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # A page still holds a view; the mapping goes away with the last one
+
+
+class ComicFile:
+    """Headless reader over any supported comic file: page list, ComicInfo fields and decoded pages."""
+
+    def __init__(self, file_path, pool_size=DEFAULT_POOL_SIZE):
+        self.file_path = file_path
+        self.extension = os.path.splitext(file_path)[1].lower()
+        self.fields = {}
+        if is_remote(file_path):
+            from remote_archive import RemoteZipFile, remote_extension  # Imported on first remote open
+            self.extension = remote_extension(file_path)
+            if self.extension != '.cbz':
+                raise RuntimeError(f"Only .cbz comics can be read from a URL, not {self.extension or 'this file'}")
+            self.archive = RemoteZipFile(file_path)
+        elif self.extension == '.cbz':
+            self.archive = MappedZipFile(file_path, pool_size)
+        elif self.extension == '.cbr':
+            self.archive = rar_backend().RarFile(file_path)
+            if is_solid_rar(self.archive):
+                self.archive = SolidRarArchive(self.archive)
+        elif self.extension == '.pdf':
+            self.archive = PdfDocument(file_path)
+        else:
+            raise RuntimeError(f"Unsupported comic file type: {self.extension}")
+
+        all_files = self.archive.namelist()
+        self.fast_index = read_fast_index(self.archive) if FAST_CBZ_INDEX in all_files else None
+        if self.extension == '.pdf':
+            self.image_files = all_files
+        elif self.fast_index is not None:
+            self.image_files = [page["name"] for page in self.fast_index["pages"]]
+        else:
+            self.image_files = filter_image_files(all_files, self.extension)
+        if "ComicInfo.xml" in all_files:
+            try:
+                self.fields = comic_info_fields(self.read("ComicInfo.xml").decode('utf-8', errors='ignore'))
+            except ET.ParseError as e:
+                logging.error("Failed to parse ComicInfo.xml in %s: %s", file_path, str(e))
+
+    def read(self, name):
+        """Raw bytes of an archive member (not available for PDF pages)."""
+        return self.archive.read(name)
+
+    def open(self, name):
+        if isinstance(self.archive, MappedZipFile):
+            return self.archive.open(name)
+        return io.BytesIO(self.archive.read(name))
+
+    def load_page(self, name, target_width=None, draft_size=None):
+        """Decode a page; PDFs are rasterized straight to target_width, other formats at full size
+        (or JPEG-draft reduced towards draft_size)."""
+        if isinstance(self.archive, PdfDocument):
+            return self.archive.render(name, target_width)
+        with self.open(name) as page_file:
+            img = Image.open(page_file)
+            if draft_size:
+                img.draft("RGB", draft_size)
+            img.load()
+        return img
+
+    def close(self):
+        self.archive.close()
@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from PIL import Image
+
+from comic_archive import ComicFile
+from disk_cache import DiskCache, archive_identity, PAGE
+from library import walk_comics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_MAX_OPEN = 16
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+MIN_WIDTH, MAX_WIDTH = 16, 4096
+JPEG_QUALITY = 85
+LISTING_TTL = 30  # Seconds a walk of the file base answers /comics before it is walked again
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+ROUTE = re.compile(r"^/comics/(?P<comic>.+?)/(?P<resource>pages|info)(?:/(?P<page>\d+))?/?$")
+CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _OpenComic:
+    def __init__(self, comic, identity):
+        self.comic = comic
+        self.identity = identity
+        self.users = 0
+        self.evicted = False
+
+
+class ComicHandles:
+    """Bounded LRU of open comics shared by every connection; evicted comics close once no reader holds them."""
+
+    def __init__(self, max_open=DEFAULT_MAX_OPEN):
+        self.max_open = max(1, max_open)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def acquire(self, path):
+        identity = archive_identity(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.identity != identity:
+                self._evict(path)
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(path)
+                entry.users += 1
+                return entry
+
+        comic = ComicFile(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.identity == identity:
+                comic.close()
+            else:
+                if entry is not None:
+                    self._evict(path)
+                entry = _OpenComic(comic, identity)
+                self.entries[path] = entry
+                while len(self.entries) > self.max_open:
+                    self._evict(next(iter(self.entries)))
+            entry.users += 1
+            return entry
+
+    def release(self, entry):
+        with self.lock:
+            entry.users -= 1
+            if entry.evicted and entry.users == 0:
+                entry.comic.close()
+
+    def _evict(self, path):
+        entry = self.entries.pop(path)
+        entry.evicted = True
+        if entry.users == 0:
+            entry.comic.close()
+
+    def close(self):
+        with self.lock:
+            for path in list(self.entries):
+                self._evict(path)
+
+
+class ResponseCache:
+    """Byte-budgeted LRU of encoded page responses."""
+
+    def __init__(self, budget_bytes=DEFAULT_CACHE_BYTES):
+        self.budget = budget_bytes
+        self.used = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        response = self.entries.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key, content_type, body):
+        if key in self.entries:
+            self.used -= len(self.entries.pop(key)[1])
+        if len(body) > self.budget:
+            return
+        self.entries[key] = (content_type, body)
+        self.used += len(body)
+        while self.used > self.budget:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.used -= len(evicted)
+
+
+def make_etag(*parts):
+    return '"' + hashlib.sha1("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest() + '"'
+
+
+def query_int(query, name, default):
+    try:
+        return int(query[name][0]) if name in query else default
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer")
+
+
+def encoded_content_type(data):
+    """Content type of an image from the disk cache, which stores PNG for modes JPEG can't hold."""
+    return "image/png" if data.startswith(PNG_SIGNATURE) else "image/jpeg"
+
+
+class ComicServer:
+    """Headless HTTP server for page lists, ComicInfo metadata and resized pages from a file base."""
+
+    def __init__(self, root, max_open=DEFAULT_MAX_OPEN, cache_bytes=DEFAULT_CACHE_BYTES, disk_cache=None,
+                 workers=None):
+        self.root = os.path.abspath(root)
+        self.handles = ComicHandles(max_open)
+        self.cache = ResponseCache(cache_bytes)
+        self.disk_cache = disk_cache
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="comic-server")
+        self.inflight = {}
+        self.listing = None  # (monotonic time of the walk, sorted relative paths)
+        self.server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
+        self.handles.close()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                    if not request_line:
+                        break
+                    try:
+                        method, target, version = request_line.decode("latin-1").split()
+                    except ValueError:
+                        break
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # A request or header line longer than the stream limit; the rest of it can't be framed
+                    await self.respond(writer, "GET", 400, {"Content-Type": "text/plain; charset=utf-8"},
+                                       b"Request line or header too long", keep_alive=False)
+                    break
+
+                status, response_headers, body = await self.dispatch(method, target, headers)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self.respond(writer, method, status, response_headers, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, method, status, response_headers, body, keep_alive):
+        response_headers["Content-Length"] = str(len(body))
+        response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+        head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in response_headers.items())
+        writer.write((head + "\r\n").encode("latin-1"))
+        if method != "HEAD":
+            writer.write(body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, headers):
+        try:
+            if method not in ("GET", "HEAD"):
+                raise HttpError(405, "Only GET and HEAD are supported")
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+            path = unquote(url.path)
+            if path.rstrip("/") == "/comics":
+                return await self.list_comics(query)
+            match = ROUTE.match(path)
+            if not match:
+                raise HttpError(404, "Not found")
+            comic_path = self.resolve(match.group("comic"))
+            if match.group("resource") == "info":
+                return await self.comic_metadata(comic_path, headers, info=True)
+            if match.group("page") is None:
+                return await self.comic_metadata(comic_path, headers, info=False)
+            width = None
+            if "width" in query:
+                try:
+                    width = min(max(int(query["width"][0]), MIN_WIDTH), MAX_WIDTH)
+                except ValueError:
+                    raise HttpError(400, "width must be an integer")
+            return await self.page(comic_path, int(match.group("page")), width, headers)
+        except HttpError as e:
+            return e.status, {"Content-Type": "text/plain; charset=utf-8"}, str(e).encode("utf-8")
+        except Exception as e:
+            logging.error("Request %s failed: %s", target, str(e))
+            return 500, {"Content-Type": "text/plain; charset=utf-8"}, b"Internal server error"
+
+    def resolve(self, relative_path):
+        path = os.path.abspath(os.path.join(self.root, relative_path))
+        if os.path.commonpath([self.root, path]) != self.root or not os.path.isfile(path):
+            raise HttpError(404, "No such comic")
+        return path
+
+    async def run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def list_comics(self, query):
+        offset = max(0, query_int(query, "offset", 0))
+        limit = max(0, query_int(query, "limit", 100))
+        paths = await self.comic_paths()
+        body = {"total": len(paths), "offset": offset,
+                "comics": [path.replace(os.sep, "/") for path in paths[offset:offset + limit]]}
+        return 200, {"Content-Type": "application/json"}, json.dumps(body).encode("utf-8")
+
+    async def comic_paths(self):
+        listing = self.listing
+        if listing is None or time.monotonic() - listing[0] > LISTING_TTL:
+            paths = await self.run(
+                lambda: sorted(os.path.relpath(path, self.root) for path, _, _ in walk_comics(self.root)))
+            listing = self.listing = (time.monotonic(), paths)
+        return listing[1]
+
+    def _with_comic(self, path, function):
+        entry = self.handles.acquire(path)
+        try:
+            return function(entry)
+        finally:
+            self.handles.release(entry)
+
+    async def comic_metadata(self, path, headers, info):
+        identity = archive_identity(path)
+        etag = make_etag(identity, "info" if info else "pages")
+        if headers.get("if-none-match") == etag:
+            return 304, {"ETag": etag}, b""
+        if info:
+            body = await self.run(self._with_comic, path, lambda entry: {"fields": entry.comic.fields})
+        else:
+            body = await self.run(self._with_comic, path, lambda entry: {
+                "count": len(entry.comic.image_files), "pages": entry.comic.image_files})
+        return 200, {"Content-Type": "application/json", "ETag": etag}, json.dumps(body).encode("utf-8")
+
+    async def page(self, path, index, width, headers):
+        identity = archive_identity(path)
+        key = (identity, index, width)
+        etag = make_etag(*key)
+        response_headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+        if headers.get("if-none-match") == etag:
+            return 304, response_headers, b""
+
+        cached = self.cache.get(key)
+        if cached is None:
+            # Concurrent requests for the same rendition share one decode
+            future = self.inflight.get(key)
+            if future is None:
+                future = asyncio.ensure_future(self.run(self._render_page, path, identity, index, width))
+                self.inflight[key] = future
+                future.add_done_callback(lambda f: self.inflight.pop(key, None))
+            cached = await asyncio.shield(future)
+            self.cache.put(key, *cached)
+        content_type, body = cached
+        response_headers["Content-Type"] = content_type
+        return 200, response_headers, body
+
+    def _render_page(self, path, identity, index, width):
+        def render(entry):
+            comic = entry.comic
+            if not 0 <= index < len(comic.image_files):
+                raise HttpError(404, "No such page")
+            name = comic.image_files[index]
+            if width is None and comic.extension != ".pdf":
+                return CONTENT_TYPES.get(os.path.splitext(name)[1].lower(), "application/octet-stream"), comic.read(name)
+            if width is not None and self.disk_cache is not None:
+                data = self.disk_cache.get(identity, PAGE, name, width)
+                if data is not None:
+                    return encoded_content_type(data), data
+            img = comic.load_page(name, width, draft_size=(width, 1) if width else None)
+            if width is not None and img.width != width:
+                img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            buffer = io.BytesIO()
+            img.save(buffer, "JPEG", quality=JPEG_QUALITY)
+            data = buffer.getvalue()
+            if width is not None and self.disk_cache is not None:
+                self.disk_cache.put(identity, PAGE, name, width, data)
+            return "image/jpeg", data
+
+        return self._with_comic(path, render)
+
+
+async def serve(args):
+    disk_cache = DiskCache(args.disk_cache) if args.disk_cache else None
+    server = ComicServer(args.root, args.max_open, args.cache_bytes, disk_cache, args.workers)
+    host, port = await server.start(args.host, args.port)
+    logging.info("Serving comics from %s on http://%s:%d/comics", server.root, host, port)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+        if disk_cache is not None:
+            disk_cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve comics from a file base over HTTP")
+    parser.add_argument("root", help="directory holding the comic files")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-open", type=int, default=DEFAULT_MAX_OPEN, help="comics kept open at once")
+    parser.add_argument("--cache-bytes", type=int, default=DEFAULT_CACHE_BYTES, help="in-memory response cache size")
+    parser.add_argument("--disk-cache", help="share renditions through this disk cache database")
+    parser.add_argument("--workers", type=int, default=None, help="decode threads")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from comic_archive import is_remote
+
+DEFAULT_CACHE_PATH = "spinner_rack_cache.db"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+PAGE = "page"
+THUMBNAIL = "thumbnail"
+TRIM_EVERY = 32  # Puts between checks of the total cache size
+
+
+def archive_identity(file_path):
+    """Identify an archive by absolute path, size and modification time."""
+    if is_remote(file_path):
+        from remote_archive import remote_identity
+        return remote_identity(file_path)
+    stat = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def encode_image(img):
+    buffer = io.BytesIO()
+    if img.mode == "RGBX":
+        img = img.convert("RGB")  # Pages rendered into shared memory; the padding byte isn't worth storing
+    if img.mode in ("RGB", "L"):
+        img.save(buffer, "JPEG", quality=92)
+    else:
+        img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class DiskCache:
+    """SQLite-backed LRU store of encoded thumbnails and page renditions, shared across sessions."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.lock = threading.Lock()  # Guards the counters and the list of connections
+        self.connections = []
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk-cache")
+        self.puts_since_trim = 0
+        self.hits = 0
+        self.misses = 0
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _connection(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            # Each thread uses only its own connection; close() may close it from another thread
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+            with self.lock:
+                self.connections.append(db)
+        return db
+
+    @staticmethod
+    def _key(identity, kind, page, width):
+        return hashlib.sha1(f"{identity}\0{kind}\0{page}\0{width}".encode("utf-8")).hexdigest()
+
+    def get(self, identity, kind, page, width):
+        key = self._key(identity, kind, page, width)
+        try:
+            db = self._connection()
+            row = db.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+            with self.lock:
+                if row is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if row is None:
+                return None
+            with db:
+                db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+        except sqlite3.Error as e:
+            logging.error("Disk cache read failed: %s", str(e))
+            return None
+
+    def put(self, identity, kind, page, width, data):
+        key = self._key(identity, kind, page, width)
+        try:
+            db = self._connection()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO entries (key, data, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, sqlite3.Binary(data), len(data), time.time()),
+                )
+            with self.lock:
+                self.puts_since_trim += 1
+                due = self.puts_since_trim >= TRIM_EVERY
+                if due:
+                    self.puts_since_trim = 0
+            if due:
+                self.trim()
+        except sqlite3.Error as e:
+            logging.error("Disk cache write failed: %s", str(e))
+
+    def get_image(self, identity, kind, page, width):
+        data = self.get(identity, kind, page, width)
+        if data is None:
+            return None
+        try:
+            img = Image.open(io.BytesIO(data))
+            img.load()
+            return img
+        except Exception as e:
+            logging.error("Corrupt disk cache entry for %s: %s", page, str(e))
+            return None
+
+    def put_image_async(self, identity, kind, page, width, img):
+        """Encode and store img on the writer thread so callers never wait on disk I/O."""
+        self.writer.submit(self._put_image, identity, kind, page, width, img)
+
+    def _put_image(self, identity, kind, page, width, img):
+        try:
+            self.put(identity, kind, page, width, encode_image(img))
+        except Exception as e:
+            logging.error("Failed to store %s in disk cache: %s", page, str(e))
+
+    def trim(self):
+        """Evict least recently used entries until the cache fits in max_bytes."""
+        db = self._connection()
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        with db:
+            db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        logging.debug("Disk cache evicted %d entries", len(doomed))
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """Close every thread's connection; call once the threads using the cache have finished."""
+        self.writer.shutdown(wait=True)
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for db in connections:
+            db.close()
+        self.local.db = None
@@ -0,0 +1,288 @@
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from PIL import Image
+
+from comic_archive import ComicFile
+from library import Library, DEFAULT_LIBRARY_PATH
+
+DEFAULT_OUTPUT_DIR = "feeds"
+PAGE_SIZE = 50  # Entries per OPDS acquisition page
+RSS_ITEMS = 100
+COVER_WIDTH = 300
+STATE_FILE = "feed_state.db"
+COVERS_DIR = "covers"
+ACQUISITION_TYPES = {"cbz": "application/vnd.comicbook+zip", "cbr": "application/vnd.comicbook-rar",
+                     "pdf": "application/pdf"}
+ATOM_HEADER = ('<?xml version="1.0" encoding="utf-8"?>\n'
+               '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/terms/" '
+               'xmlns:opds="http://opds-spec.org/2010/catalog">\n')
+PAGED_FEED = re.compile(r"^(new|series)-\d+\.xml$")
+NAVIGATION_TYPE = "application/atom+xml;profile=opds-catalog;kind=navigation"
+ACQUISITION_FEED_TYPE = "application/atom+xml;profile=opds-catalog;kind=acquisition"
+
+
+def timestamp(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def rfc822(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+
+
+def entry_id(row):
+    return "urn:sha1:" + hashlib.sha1(row["path"].encode("utf-8")).hexdigest()
+
+
+def cover_name(row):
+    """Covers are named after the file's identity, so a changed comic never reuses a stale cover."""
+    digest = hashlib.sha1(f"{row['path']}|{row['size']}|{row['mtime_ns']}".encode("utf-8")).hexdigest()
+    return f"{digest[:20]}.jpg"
+
+
+def entry_title(row):
+    title = row["series"] or row["title"] or os.path.splitext(os.path.basename(row["path"]))[0]
+    if row["series"] and row["number"]:
+        title += f" #{row['number']}"
+    if row["series"] and row["title"]:
+        title += f": {row['title']}"
+    return title
+
+
+def make_cover(job):
+    """Process-pool worker: write a COVER_WIDTH JPEG of a comic's cover page."""
+    path, cover_page, destination = job
+    try:
+        comic = ComicFile(path, pool_size=1)
+        try:
+            img = comic.load_page(cover_page, COVER_WIDTH, draft_size=(COVER_WIDTH, 1))
+        finally:
+            comic.close()
+        if img.width > COVER_WIDTH:
+            img = img.resize((COVER_WIDTH, max(1, round(img.height * COVER_WIDTH / img.width))), Image.LANCZOS)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(destination + ".part", "JPEG", quality=85)
+        os.replace(destination + ".part", destination)
+        return path, None
+    except Exception as e:
+        return path, str(e)
+
+
+class FeedBuilder:
+    """Static RSS and paged OPDS feeds over the library catalog, regenerated incrementally."""
+
+    def __init__(self, library, output_dir=DEFAULT_OUTPUT_DIR, base_url="", comics_url=None):
+        self.library = library
+        self.output_dir = os.path.abspath(output_dir)
+        self.base_url = base_url.rstrip("/") + "/" if base_url else ""
+        self.comics_url = comics_url.rstrip("/") + "/" if comics_url else None
+        os.makedirs(os.path.join(self.output_dir, COVERS_DIR), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(self.output_dir, STATE_FILE))
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "path TEXT PRIMARY KEY, stamp TEXT NOT NULL, cover TEXT, atom TEXT NOT NULL, rss TEXT NOT NULL)"
+        )
+
+    def entry_stamp(self, row):
+        # Entries embed the published URLs, so changing them regenerates every entry
+        return f"{row['size']}|{row['mtime_ns']}|{self.base_url}|{self.comics_url}"
+
+    def comic_link(self, path, root):
+        if self.comics_url is not None:
+            return self.comics_url + quote(os.path.relpath(path, root).replace(os.sep, "/"))
+        return quote(os.path.relpath(path, self.output_dir).replace(os.sep, "/"))
+
+    def render_entry(self, row, root, cover):
+        """Return the (Atom entry, RSS item) fragments for one catalog row."""
+        title = escape(entry_title(row))
+        link = self.comic_link(row["path"], root)
+        updated = timestamp(row["mtime_ns"] / 1e9)
+        mime = ACQUISITION_TYPES.get(row["format"], "application/octet-stream")
+        summary = escape(row["summary"] or "")
+        atom = [f"<entry>\n<title>{title}</title>\n<id>{entry_id(row)}</id>\n"
+                f"<updated>{updated}</updated>\n"]
+        if row["writer"]:
+            atom.append(f"<author><name>{escape(row['writer'])}</name></author>\n")
+        if row["publisher"]:
+            atom.append(f"<dc:publisher>{escape(row['publisher'])}</dc:publisher>\n")
+        if summary:
+            atom.append(f"<summary>{summary}</summary>\n")
+        if cover:
+            cover_link = quoteattr(f"{COVERS_DIR}/{cover}")
+            atom.append(f"<link rel=\"http://opds-spec.org/image\" href={cover_link} type=\"image/jpeg\"/>\n"
+                        f"<link rel=\"http://opds-spec.org/image/thumbnail\" href={cover_link} type=\"image/jpeg\"/>\n")
+        atom.append(f"<link rel=\"http://opds-spec.org/acquisition\" href={quoteattr(link)} type=\"{mime}\"/>\n"
+                    "</entry>\n")
+
+        rss = [f"<item>\n<title>{title}</title>\n<link>{escape(self.base_url + link)}</link>\n"
+               f"<guid isPermaLink=\"false\">{entry_id(row)}</guid>\n"
+               f"<pubDate>{rfc822(row['added_at'])}</pubDate>\n"]
+        if summary:
+            rss.append(f"<description>{summary}</description>\n")
+        rss.append(f"<enclosure url={quoteattr(self.base_url + link)} length=\"{row['size']}\" type=\"{mime}\"/>\n"
+                   "</item>\n")
+        return "".join(atom), "".join(rss)
+
+    def build(self, roots, workers=None, progress=None):
+        """Rescan roots, refresh entries and covers for new or changed comics, and rewrite the feeds."""
+        roots = [os.path.abspath(root) for root in roots]
+        self.library.scan(roots, workers, progress)
+        rows = {}
+        for row in self.library.search(sort="added", limit=-1):
+            root = next((root for root in roots if row["path"].startswith(os.path.join(root, ""))), None)
+            if root is not None and row["error"] is None and row["page_count"]:
+                rows[row["path"]] = (row, root)
+
+        known = {path: (stamp, cover) for path, stamp, cover in self.db.execute("SELECT path, stamp, cover FROM entries")}
+        # An entry whose cover failed is retried on every build, not only once its file changes
+        changed = [row for path, (row, _) in rows.items()
+                   if known.get(path, (None, None))[0] != self.entry_stamp(row) or known[path][1] is None]
+        removed = [path for path in known if path not in rows]
+
+        covers = {}
+        jobs = []
+        for row in changed:
+            covers[row["path"]] = cover_name(row)
+            destination = os.path.join(self.output_dir, COVERS_DIR, covers[row["path"]])
+            if not os.path.exists(destination):
+                jobs.append((row["path"], row["cover_page"], destination))
+        if jobs:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for path, error in executor.map(make_cover, jobs, chunksize=8):
+                    if error is not None:
+                        logging.error("No cover for %s: %s", path, error)
+                        covers.pop(path, None)
+
+        with self.db:
+            for path in removed + [row["path"] for row in changed]:
+                old_cover = known.get(path, (None, None))[1]
+                if old_cover and old_cover != covers.get(path):
+                    try:
+                        os.remove(os.path.join(self.output_dir, COVERS_DIR, old_cover))
+                    except FileNotFoundError:
+                        pass
+            self.db.executemany("DELETE FROM entries WHERE path = ?", [(path,) for path in removed])
+            for row in changed:
+                cover = covers.get(row["path"])
+                atom, rss = self.render_entry(row, rows[row["path"]][1], cover)
+                self.db.execute(
+                    "INSERT OR REPLACE INTO entries (path, stamp, cover, atom, rss) VALUES (?, ?, ?, ?, ?)",
+                    (row["path"], self.entry_stamp(row), cover, atom, rss),
+                )
+
+        written = self.write_feeds([row for row, _ in rows.values()])
+        logging.info("Feeds: %d entries updated, %d removed, %d files rewritten", len(changed), len(removed), written)
+        return {"updated": len(changed), "removed": len(removed), "entries": len(rows), "written": written}
+
+    def write_feeds(self, rows):
+        fragments = {path: (atom, rss) for path, atom, rss in self.db.execute("SELECT path, atom, rss FROM entries")}
+        newest = sorted(rows, key=lambda row: (-row["added_at"], row["path"]))
+        by_series = sorted(rows, key=lambda row: ((row["series"] or row["title"] or "").lower(),
+                                                  row["number_sort"] if row["number_sort"] is not None else float("inf"),
+                                                  row["path"]))
+        updated = timestamp(max((row["scanned_at"] for row in rows), default=time.time()))
+        written = 0
+        wanted = {"catalog.xml", "rss.xml"}
+        for name, title, ordered in (("new", "New Arrivals", newest), ("series", "All Comics by Series", by_series)):
+            pages = max(1, -(-len(ordered) // PAGE_SIZE))
+            for page in range(1, pages + 1):
+                page_rows = ordered[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+                entries = [fragments[row["path"]][0] for row in page_rows]
+                # Each page carries its own entries' latest change, so untouched pages stay byte-identical
+                page_updated = timestamp(max((row["scanned_at"] for row in page_rows), default=time.time()))
+                links = [("self", f"{name}-{page}.xml"), ("start", "catalog.xml"), ("up", "catalog.xml")]
+                if page > 1:
+                    links.append(("previous", f"{name}-{page - 1}.xml"))
+                if page < pages:
+                    links.append(("next", f"{name}-{page + 1}.xml"))
+                feed_file = f"{name}-{page}.xml"
+                wanted.add(feed_file)
+                written += self.write_if_changed(
+                    feed_file, self.atom_feed(f"spinner-rack:{name}:{page}", title, page_updated, links,
+                                              ACQUISITION_FEED_TYPE, "".join(entries)))
+
+        navigation = "".join(
+            f"<entry>\n<title>{title}</title>\n<id>spinner-rack:{name}</id>\n<updated>{updated}</updated>\n"
+            f"<link rel=\"subsection\" href=\"{name}-1.xml\" type=\"{ACQUISITION_FEED_TYPE}\"/>\n</entry>\n"
+            for name, title in (("new", "New Arrivals"), ("series", "All Comics by Series"))
+        )
+        written += self.write_if_changed("catalog.xml", self.atom_feed(
+            "spinner-rack:catalog", "Spinner Rack", updated, [("self", "catalog.xml"), ("start", "catalog.xml")],
+            NAVIGATION_TYPE, navigation))
+
+        items = "".join(fragments[row["path"]][1] for row in newest[:RSS_ITEMS])
+        rss = ('<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0">\n<channel>\n'
+               f"<title>Spinner Rack: New Arrivals</title>\n<link>{escape(self.base_url + 'catalog.xml')}</link>\n"
+               "<description>Comics recently added to the file base</description>\n"
+               f"<lastBuildDate>{rfc822(max((row['added_at'] for row in rows), default=time.time()))}</lastBuildDate>\n"
+               f"{items}</channel>\n</rss>\n")
+        written += self.write_if_changed("rss.xml", rss)
+
+        # Drop pages left over from a larger collection
+        for name in os.listdir(self.output_dir):
+            if PAGED_FEED.match(name) and name not in wanted:
+                os.remove(os.path.join(self.output_dir, name))
+        return written
+
+    def atom_feed(self, feed_id, title, updated, links, link_type, entries):
+        head = "".join(
+            f"<link rel=\"{rel}\" href={quoteattr(self.base_url + href)} "
+            f"type=\"{NAVIGATION_TYPE if rel in ('start', 'up') else link_type}\"/>\n"
+            for rel, href in links
+        )
+        return (f"{ATOM_HEADER}<id>{feed_id}</id>\n<title>{escape(title)}</title>\n<updated>{updated}</updated>\n"
+                f"{head}{entries}</feed>\n")
+
+    def write_if_changed(self, name, text):
+        """Rewrite a feed file only when its content changed, so unchanged pages keep their mtime and ETag."""
+        path = os.path.join(self.output_dir, name)
+        data = text.encode("utf-8")
+        try:
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return 0
+        except FileNotFoundError:
+            pass
+        with open(path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(path + ".part", path)
+        return 1
+
+    def close(self):
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build RSS and OPDS feeds for a comic file base")
+    parser.add_argument("roots", nargs="+", help="directories holding the comic files")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="directory for the feeds and covers")
+    parser.add_argument("--db", default=DEFAULT_LIBRARY_PATH, help="library catalog database file")
+    parser.add_argument("--base-url", default="", help="URL the output directory is published at")
+    parser.add_argument("--comics-url", help="URL the comic roots are published at (default: relative file links)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    library = Library(args.db)
+    builder = FeedBuilder(library, args.output, args.base_url, args.comics_url)
+    try:
+        result = builder.build(args.roots, args.workers)
+    finally:
+        builder.close()
+        library.close()
+    print(f"{result['entries']} entries, {result['updated']} updated, {result['removed']} removed, "
+          f"{result['written']} feed files written")
+
+
+if __name__ == "__main__":
+    main()
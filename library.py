@@ -0,0 +1,213 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from comic_archive import COMIC_EXTENSIONS, COMIC_INFO_FIELDS, read_comic_metadata
+
+DEFAULT_LIBRARY_PATH = "spinner_rack_library.db"
+FIELD_COLUMNS = {field: field.lower() for field in COMIC_INFO_FIELDS}
+SORT_COLUMNS = {
+    "series": "series, number_sort, title",
+    "title": "title",
+    "writer": "writer, series, number_sort",
+    "publisher": "publisher, series, number_sort",
+    "added": "added_at DESC",
+    "path": "path",
+}
+SEARCH_COLUMNS = ("series", "writer", "publisher", "title")
+BATCH_SIZE = 200
+
+
+def scan_comic(entry):
+    """Process-pool worker: read one comic's catalog row."""
+    path, size, mtime_ns = entry
+    row = {"path": path, "size": size, "mtime_ns": mtime_ns, "format": os.path.splitext(path)[1].lower()[1:],
+           "page_count": None, "cover_page": None, "error": None}
+    try:
+        metadata = read_comic_metadata(path)
+        row["page_count"] = metadata["page_count"]
+        row["cover_page"] = metadata["cover_page"]
+        for field, column in FIELD_COLUMNS.items():
+            row[column] = metadata["fields"].get(field)
+    except Exception as e:
+        row["error"] = str(e)
+    return row
+
+
+def walk_comics(root):
+    """Yield (path, size, mtime_ns) for every comic file below root."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(COMIC_EXTENSIONS):
+                        stat = entry.stat()
+                        yield os.path.abspath(entry.path), stat.st_size, stat.st_mtime_ns
+        except OSError as e:
+            logging.error("Cannot scan %s: %s", directory, str(e))
+
+
+class Library:
+    """SQLite catalog of comic files with their ComicInfo metadata as indexed columns."""
+
+    def __init__(self, path=DEFAULT_LIBRARY_PATH):
+        self.path = path
+        self.local = threading.local()
+        field_columns = ", ".join(f"{column} TEXT COLLATE NOCASE" for column in FIELD_COLUMNS.values())
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS comics ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, format TEXT NOT NULL, "
+                "page_count INTEGER, cover_page TEXT, error TEXT, number_sort REAL, "
+                f"added_at REAL NOT NULL, scanned_at REAL NOT NULL, {field_columns})"
+            )
+            for column in ("series, number_sort", "writer", "publisher", "title", "added_at"):
+                name = column.split(",")[0]
+                db.execute(f"CREATE INDEX IF NOT EXISTS comics_{name} ON comics ({column})")
+
+    def _connection(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            self.local.db = db
+        return db
+
+    def scan(self, roots, workers=None, progress=None):
+        """Bring the catalog in line with the files under roots, re-reading only new or changed files."""
+        db = self._connection()
+        roots = [os.path.abspath(root) for root in roots]
+        known = {}
+        for root in roots:
+            prefix = os.path.join(root, "")
+            for row in db.execute("SELECT path, size, mtime_ns FROM comics WHERE substr(path, 1, ?) = ?",
+                                  (len(prefix), prefix)):
+                known[row["path"]] = (row["size"], row["mtime_ns"])
+
+        changed = []
+        seen = set()
+        for root in roots:
+            for path, size, mtime_ns in walk_comics(root):
+                seen.add(path)
+                if known.get(path) != (size, mtime_ns):
+                    changed.append((path, size, mtime_ns))
+        removed = [path for path in known if path not in seen]
+
+        with db:
+            db.executemany("DELETE FROM comics WHERE path = ?", [(path,) for path in removed])
+
+        scanned = 0
+        if changed:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                batch = []
+                for row in executor.map(scan_comic, changed, chunksize=8):
+                    batch.append(row)
+                    if len(batch) >= BATCH_SIZE:
+                        self._store(batch)
+                        scanned += len(batch)
+                        batch = []
+                        if progress:
+                            progress(scanned, len(changed))
+                self._store(batch)
+                scanned += len(batch)
+                if progress:
+                    progress(scanned, len(changed))
+        logging.info("Library scan: %d new or changed, %d removed, %d unchanged",
+                     len(changed), len(removed), len(seen) - len(changed))
+        return {"scanned": len(changed), "removed": len(removed), "unchanged": len(seen) - len(changed)}
+
+    def _store(self, rows):
+        if not rows:
+            return
+        now = time.time()
+        columns = ["path", "size", "mtime_ns", "format", "page_count", "cover_page", "error", "number_sort",
+                   "added_at", "scanned_at"] + list(FIELD_COLUMNS.values())
+        values = []
+        for row in rows:
+            try:
+                number_sort = float(row.get("number") or "")
+            except ValueError:
+                number_sort = None
+            values.append([row["path"], row["size"], row["mtime_ns"], row["format"], row["page_count"],
+                           row["cover_page"], row["error"], number_sort, now, now]
+                          + [row.get(column) for column in FIELD_COLUMNS.values()])
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in ("path", "added_at"))
+        db = self._connection()
+        with db:
+            db.executemany(
+                f"INSERT INTO comics ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(path) DO UPDATE SET {updates}",
+                values,
+            )
+
+    def search(self, text=None, series=None, writer=None, publisher=None, sort="series", limit=100, offset=0):
+        """Indexed prefix search over the catalog; text matches any of series, writer, publisher or title."""
+        clauses = []
+        params = []
+        for column, value in (("series", series), ("writer", writer), ("publisher", publisher)):
+            if value:
+                clauses.append(f"{column} LIKE ?")
+                params.append(value + "%")
+        if text:
+            clauses.append("(" + " OR ".join(f"{column} LIKE ?" for column in SEARCH_COLUMNS) + ")")
+            params.extend([text + "%"] * len(SEARCH_COLUMNS))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = SORT_COLUMNS.get(sort, SORT_COLUMNS["series"])
+        query = f"SELECT * FROM comics {where} ORDER BY {order} LIMIT ? OFFSET ?"
+        return [dict(row) for row in self._connection().execute(query, params + [limit, offset])]
+
+    def get(self, path):
+        row = self._connection().execute("SELECT * FROM comics WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return dict(row) if row else None
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM comics").fetchone()[0]
+
+    def close(self):
+        db = getattr(self.local, "db", None)
+        if db is not None:
+            db.close()
+            self.local.db = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spinner Rack library catalog")
+    parser.add_argument("--db", default=DEFAULT_LIBRARY_PATH, help="catalog database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan_parser = commands.add_parser("scan", help="scan directories for new or changed comics")
+    scan_parser.add_argument("roots", nargs="+")
+    scan_parser.add_argument("--workers", type=int, default=None)
+    search_parser = commands.add_parser("search", help="search the catalog")
+    search_parser.add_argument("text", nargs="?")
+    search_parser.add_argument("--series")
+    search_parser.add_argument("--writer")
+    search_parser.add_argument("--publisher")
+    search_parser.add_argument("--sort", choices=sorted(SORT_COLUMNS), default="series")
+    search_parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    library = Library(args.db)
+    if args.command == "scan":
+        result = library.scan(args.roots, args.workers,
+                              progress=lambda done, total: print(f"Scanned {done} of {total}", flush=True))
+        print(f"{result['scanned']} scanned, {result['removed']} removed, {result['unchanged']} unchanged")
+    else:
+        for row in library.search(args.text, args.series, args.writer, args.publisher, args.sort, args.limit):
+            number = f" #{row['number']}" if row["number"] else ""
+            print(f"{row['series'] or row['title'] or os.path.basename(row['path'])}{number}\t{row['path']}")
+    library.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import threading
+from collections import OrderedDict
+
+ORIGINALS = "originals"
+RENDITIONS = "renditions"
+THUMBNAILS = "thumbnails"
+
+DEFAULT_BUDGET_BYTES = 512 * 1024 * 1024
+DEFAULT_ORIGINALS_SHARE = 0.5
+DEFAULT_THUMBNAIL_BUDGET_BYTES = 32 * 1024 * 1024
+
+
+def image_size_bytes(img):
+    """Approximate the memory held by a decoded PIL image."""
+    return img.width * img.height * len(img.getbands())
+
+
+class _Tier:
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def peek(self, key):
+        entry = self.entries.get(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key, value, size):
+        if key in self.entries:
+            self.used -= self.entries.pop(key)[1]
+        if size > self.budget:
+            return
+        self.entries[key] = (value, size)
+        self.used += size
+        self.shrink()
+
+    def shrink(self):
+        while self.used > self.budget:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.used -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.used = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.used,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class PageCache:
+    """Byte-budgeted LRU cache of decoded originals and resized renditions."""
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES, originals_share=DEFAULT_ORIGINALS_SHARE,
+                 thumbnail_budget_bytes=DEFAULT_THUMBNAIL_BUDGET_BYTES):
+        originals_share = min(max(originals_share, 0.0), 1.0)
+        originals_budget = int(budget_bytes * originals_share)
+        self.lock = threading.Lock()
+        self.tiers = {
+            ORIGINALS: _Tier(originals_budget),
+            RENDITIONS: _Tier(budget_bytes - originals_budget),
+            THUMBNAILS: _Tier(thumbnail_budget_bytes),
+        }
+
+    def get(self, tier, key):
+        with self.lock:
+            return self.tiers[tier].get(key)
+
+    def peek(self, tier, key):
+        """Look an entry up without counting a hit or miss or moving it in the LRU order."""
+        with self.lock:
+            return self.tiers[tier].peek(key)
+
+    def put(self, tier, key, img):
+        with self.lock:
+            self.tiers[tier].put(key, img, image_size_bytes(img))
+
+    def keys(self, tier):
+        with self.lock:
+            return list(self.tiers[tier].entries)
+
+    def clear(self):
+        with self.lock:
+            for tier in self.tiers.values():
+                tier.clear()
+
+    def stats(self):
+        with self.lock:
+            return {name: tier.stats() for name, tier in self.tiers.items()}
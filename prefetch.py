@@ -0,0 +1,61 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_WORKERS = 2
+DEFAULT_PAGES_AHEAD = 2
+
+
+class Prefetcher:
+    """Render upcoming pages on a worker pool so page turns hit the cache."""
+
+    def __init__(self, render, workers=DEFAULT_WORKERS):
+        self.render = render
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch")
+        self.lock = threading.RLock()
+        self.pending = {}
+
+    def schedule(self, img_filenames, target_width):
+        """Replace any queued work with renders of img_filenames at target_width."""
+        wanted = [(name, target_width) for name in img_filenames]
+        with self.lock:
+            for key, future in list(self.pending.items()):
+                if key not in wanted and future.cancel():
+                    self.pending.pop(key, None)
+            for key in wanted:
+                if key in self.pending:
+                    continue
+                future = self.executor.submit(self._run, key)
+                self.pending[key] = future
+                future.add_done_callback(lambda f, key=key: self._forget(key, f))
+
+    def wait_for(self, img_filename, target_width):
+        """Block until an in-flight render of this page finishes, or drop it if not started."""
+        with self.lock:
+            future = self.pending.get((img_filename, target_width))
+        if future is not None and not future.cancel():
+            wait([future])
+
+    def cancel(self, wait_running=False):
+        """Drop queued renders; optionally wait for the ones already running."""
+        with self.lock:
+            running = [future for future in list(self.pending.values()) if not future.cancel()]
+            self.pending.clear()
+        if wait_running and running:
+            wait(running)
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, key):
+        img_filename, target_width = key
+        try:
+            self.render(img_filename, target_width)
+        except Exception as e:
+            logging.debug("Prefetch of %s at %d failed: %s", img_filename, target_width, str(e))
+
+    def _forget(self, key, future):
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
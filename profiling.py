@@ -0,0 +1,116 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_WINDOW = 200  # Samples kept per stage for the rolling percentiles
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def memory_usage():
+    """Resident set size of this process in bytes, or None where it can't be read cheaply."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+class Profiler:
+    """Per-stage wall-clock timings with rolling percentiles and optional JSON-lines export."""
+
+    def __init__(self, window=DEFAULT_WINDOW, export_path=None):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counts = {}
+        self.export_file = None
+        if export_path:
+            self.start_export(export_path)
+
+    @contextmanager
+    def stage(self, name, **fields):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **fields)
+
+    def timed(self, name):
+        """Decorator form of stage() for timing a whole function."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds, **fields):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if self.export_file is not None:
+                line = {"ts": time.time(), "stage": name, "ms": round(seconds * 1000, 3),
+                        "thread": threading.current_thread().name}
+                line.update(fields)
+                self.export_file.write(json.dumps(line) + "\n")
+
+    def summary(self):
+        """Rolling p50/p90/p99/max in milliseconds for each stage."""
+        with self.lock:
+            snapshot = {name: (sorted(samples), self.counts[name]) for name, samples in self.samples.items()}
+        summary = {}
+        for name, (values, count) in sorted(snapshot.items()):
+            summary[name] = {
+                "count": count,
+                "p50": percentile(values, 0.5) * 1000,
+                "p90": percentile(values, 0.9) * 1000,
+                "p99": percentile(values, 0.99) * 1000,
+                "max": (values[-1] if values else 0.0) * 1000,
+            }
+        return summary
+
+    def start_export(self, path):
+        with self.lock:
+            if self.export_file is not None:
+                self.export_file.close()
+            try:
+                self.export_file = open(path, "a", buffering=1)
+            except OSError as e:
+                logging.error("Cannot write profile log %s: %s", path, str(e))
+                self.export_file = None
+
+    def export_summary(self, path, extra=None):
+        """Append one JSON line per stage with the current rolling statistics."""
+        now = time.time()
+        with open(path, "a") as f:
+            for name, stats in self.summary().items():
+                f.write(json.dumps({"ts": now, "stage": name, **stats}) + "\n")
+            if extra:
+                f.write(json.dumps({"ts": now, **extra}) + "\n")
+
+    def close(self):
+        with self.lock:
+            if self.export_file is not None:
+                self.export_file.close()
+                self.export_file = None
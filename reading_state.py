@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+DEFAULT_STATE_PATH = "bookmarks.json"
+FLUSH_DELAY_SECONDS = 2.0
+
+
+class ReadingState:
+    """Per-book reading position and view preferences, batched in memory and flushed atomically."""
+
+    def __init__(self, path=DEFAULT_STATE_PATH, flush_delay=FLUSH_DELAY_SECONDS):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.books = {}
+        self.dirty = False
+        self.timer = None
+        self.loaded = False
+
+    def _ensure_loaded(self):
+        # Read on first use rather than at start-up; the caller holds self.lock
+        if not self.loaded:
+            self.load()
+            self.loaded = True
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f) if os.path.getsize(self.path) > 0 else {}
+        except FileNotFoundError:
+            data = {}
+        except (json.JSONDecodeError, OSError) as e:
+            logging.error("Failed to load reading state from %s: %s", self.path, str(e))
+            data = {}
+        for book, state in data.items():
+            # Older bookmarks.json files map each book straight to its page number
+            self.books[book] = {"page": state} if isinstance(state, int) else dict(state)
+
+    def get(self, book):
+        with self.lock:
+            self._ensure_loaded()
+            return dict(self.books.get(book, {}))
+
+    def update(self, book, **values):
+        """Record new values for a book; the file is rewritten after flush_delay seconds without updates."""
+        with self.lock:
+            self._ensure_loaded()
+            state = self.books.setdefault(book, {})
+            if all(state.get(key) == value for key, value in values.items()):
+                return
+            state.update(values)
+            self.dirty = True
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.flush_delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        with self.write_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                snapshot = json.dumps(self.books)
+                self.dirty = False
+            directory = os.path.dirname(os.path.abspath(self.path))
+            try:
+                fd, temp_path = tempfile.mkstemp(prefix=".bookmarks-", suffix=".tmp", dir=directory)
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        f.write(snapshot)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temp_path, self.path)
+                except BaseException:
+                    try:
+                        os.unlink(temp_path)
+                    except OSError:
+                        pass
+                    raise
+            except OSError as e:
+                logging.error("Failed to save reading state: %s", str(e))
+                with self.lock:
+                    self.dirty = True
+
+    def close(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        self.flush()
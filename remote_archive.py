@@ -0,0 +1,403 @@
+import argparse
+import http.client
+import http.server
+import io
+import logging
+import os
+import re
+import threading
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urljoin, urlsplit
+
+from comic_archive import ZIP_LOCAL_HEADER, filter_image_files
+
+BLOCK_SIZE = 256 * 1024  # Unit of fetching and caching; the tail block usually holds the whole central directory
+DEFAULT_BLOCK_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_FETCHERS = 4  # Range requests in flight at once per remote archive
+MAX_REQUEST_BLOCKS = 32  # Longest run of adjacent blocks coalesced into one request
+MEMBER_SLACK = 1024  # Allowance for a local header's extra field when predicting a member's byte span
+MAX_REDIRECTS = 5
+TIMEOUT = 30
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+def remote_extension(url):
+    return os.path.splitext(urlsplit(url).path)[1].lower()
+
+
+def _connect(url):
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme.lower() == "https" else http.client.HTTPConnection
+    return connection_class(parts.hostname, parts.port, timeout=TIMEOUT)
+
+
+def _request_target(url):
+    parts = urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+def probe(url):
+    """HEAD a remote file, following redirects: (final url, size, validator for If-Range or None)."""
+    for _ in range(MAX_REDIRECTS + 1):
+        connection = _connect(url)
+        try:
+            connection.request("HEAD", _request_target(url))
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+        if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+            url = urljoin(url, response.getheader("Location"))
+            continue
+        if response.status != 200:
+            raise RuntimeError(f"{url} answered {response.status} {response.reason}")
+        if response.getheader("Content-Length") is None:
+            raise RuntimeError(f"{url} did not report its size")
+        etag = response.getheader("ETag")
+        validator = etag if etag and not etag.startswith("W/") else response.getheader("Last-Modified")
+        return url, int(response.getheader("Content-Length")), validator
+    raise RuntimeError(f"Too many redirects for {url}")
+
+
+def remote_identity(url):
+    """Identify a remote archive by URL, size and ETag or Last-Modified, like archive_identity for local files."""
+    url, size, validator = probe(url)
+    return f"{url}|{size}|{validator or ''}"
+
+
+class HttpRangeReader:
+    """Random access to a remote file through HTTP range requests, cached in BLOCK_SIZE blocks.
+
+    Missing blocks are fetched in runs of adjacent blocks, one request per run, on a small pool of kept-alive
+    connections. A block being fetched for one reader is waited for, not fetched again, by any other."""
+
+    def __init__(self, url, cache_bytes=DEFAULT_BLOCK_CACHE_BYTES, fetchers=DEFAULT_FETCHERS):
+        self.url, self.size, self.validator = probe(url)
+        self.target = _request_target(self.url)
+        self.cache_blocks = max(1, cache_bytes // BLOCK_SIZE)
+        self.lock = threading.Lock()
+        self.blocks = OrderedDict()
+        self.inflight = {}
+        self.local = threading.local()
+        self.connections = []
+        self.executor = ThreadPoolExecutor(max_workers=max(1, fetchers), thread_name_prefix="remote-fetch")
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = _connect(self.url)
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def _get_range(self, start, end):
+        headers = {"Range": f"bytes={start}-{end}"}
+        if self.validator:
+            headers["If-Range"] = self.validator  # A changed file answers 200 instead of mixing two versions
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                started = time.perf_counter()
+                connection.request("GET", self.target, headers=headers)
+                response = connection.getresponse()
+                if response.status != 206:
+                    connection.close()  # Don't read a whole-file 200 body
+                    if response.status == 200:
+                        raise RuntimeError(f"{self.url} changed on the server or does not support range requests")
+                    raise RuntimeError(f"{self.url} answered {response.status} {response.reason}")
+                body = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # A kept-alive connection the server has since dropped fails once; retry on a fresh one
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+        content_range = CONTENT_RANGE.match(response.getheader("Content-Range", ""))
+        if content_range is None or int(content_range.group(1)) != start or len(body) != end - start + 1:
+            raise RuntimeError(f"{self.url} returned the wrong range for bytes {start}-{end}")
+        with self.lock:
+            self.requests += 1
+            self.bytes_fetched += len(body)
+        logging.debug("Fetched %d bytes of %s in %.2f seconds", len(body), self.url, time.perf_counter() - started)
+        return body
+
+    def _fetch_run(self, first, last):
+        try:
+            start = first * BLOCK_SIZE
+            body = self._get_range(start, min((last + 1) * BLOCK_SIZE, self.size) - 1)
+            run = {index: body[(index - first) * BLOCK_SIZE:(index - first + 1) * BLOCK_SIZE]
+                   for index in range(first, last + 1)}
+            with self.lock:
+                for index, block in run.items():
+                    self.blocks[index] = block
+                    self.blocks.move_to_end(index)
+                while len(self.blocks) > self.cache_blocks:
+                    self.blocks.popitem(last=False)
+            return run
+        finally:
+            with self.lock:
+                for index in range(first, last + 1):
+                    self.inflight.pop(index, None)
+
+    def _request_blocks(self, indexes):
+        """Start fetching whichever of indexes aren't cached or in flight; map each index to its data or future."""
+        found = {}
+        missing = []
+        with self.lock:
+            for index in sorted(set(indexes)):
+                block = self.blocks.get(index)
+                if block is not None:
+                    self.blocks.move_to_end(index)
+                    found[index] = block
+                elif index in self.inflight:
+                    found[index] = self.inflight[index]
+                else:
+                    missing.append(index)
+            runs = []
+            for index in missing:
+                if runs and index == runs[-1][-1] + 1 and len(runs[-1]) < MAX_REQUEST_BLOCKS:
+                    runs[-1].append(index)
+                else:
+                    runs.append([index])
+            for run in runs:
+                future = self.executor.submit(self._fetch_run, run[0], run[-1])
+                for index in run:
+                    self.inflight[index] = found[index] = future
+        return found
+
+    def block_range(self, offset, length):
+        end = min(offset + length, self.size)
+        if end <= offset:
+            return range(0)
+        return range(offset // BLOCK_SIZE, (end - 1) // BLOCK_SIZE + 1)
+
+    def read(self, offset, length):
+        """Bytes [offset, offset + length), shorter only at the end of the file."""
+        blocks = self.block_range(offset, length)
+        if not blocks:
+            return b""
+        found = self._request_blocks(blocks)
+        data = b"".join(found[index] if isinstance(found[index], bytes) else found[index].result()[index]
+                        for index in blocks)
+        start = offset - blocks[0] * BLOCK_SIZE
+        return data[start:start + length]
+
+    def prefetch(self, spans):
+        """Fetch the blocks under (offset, length) spans in the background, coalescing adjacent ones."""
+        self._request_blocks([index for offset, length in spans for index in self.block_range(offset, length)])
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "bytes": self.bytes_fetched, "cached_blocks": len(self.blocks)}
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            connection.close()
+
+
+class RangeFile(io.RawIOBase):
+    """Seekable file over an HttpRangeReader, so zipfile can read the end record and central directory."""
+
+    def __init__(self, reader):
+        super().__init__()
+        self.reader = reader
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.reader.read(self.position, len(buffer))
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.reader.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self.position = offset
+        return offset
+
+    def tell(self):
+        return self.position
+
+
+class RemoteZipFile:
+    """CBZ reader over HTTP(S) range requests.
+
+    Opening reads only the end record and central directory; members are fetched as pages are read, and
+    prefetch() pulls several pages' bytes in coalesced, concurrent requests."""
+
+    def __init__(self, url, cache_bytes=DEFAULT_BLOCK_CACHE_BYTES, fetchers=DEFAULT_FETCHERS):
+        self.reader = HttpRangeReader(url, cache_bytes, fetchers)
+        self.filename = self.reader.url
+        self.identity = f"{self.reader.url}|{self.reader.size}|{self.reader.validator or ''}"
+        self.data_offsets = {}
+        try:
+            self.zip = zipfile.ZipFile(RangeFile(self.reader), 'r')
+        except BaseException:
+            self.reader.close()
+            raise
+        stats = self.reader.stats()
+        logging.debug("Opened remote %s with %d requests, %d bytes", url, stats["requests"], stats["bytes"])
+
+    def namelist(self):
+        return self.zip.namelist()
+
+    def getinfo(self, name):
+        return self.zip.getinfo(name)
+
+    def member_span(self, name):
+        """Predicted (offset, length) of a member's local header and data."""
+        info = self.zip.getinfo(name)
+        start = self.data_offsets.get(name)
+        if start is not None:
+            return start, info.compress_size
+        header = ZIP_LOCAL_HEADER.size + len(info.orig_filename.encode("utf-8")) + len(info.extra) + MEMBER_SLACK
+        return info.header_offset, header + info.compress_size
+
+    def prefetch(self, names):
+        self.reader.prefetch([self.member_span(name) for name in names])
+
+    def read(self, name):
+        info = self.zip.getinfo(name)
+        if info.flag_bits & 0x1 or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            return self.zip.read(name)  # Rare methods go through zipfile, one member at a time
+        start = self.data_offsets.get(name)
+        if start is None:
+            self.prefetch([name])  # Header and data in one request, rather than one for each
+            # The local header's name and extra lengths can differ from the central directory's
+            signature, name_length, extra_length = ZIP_LOCAL_HEADER.unpack(
+                self.reader.read(info.header_offset, ZIP_LOCAL_HEADER.size)
+            )
+            if signature != b"PK\x03\x04":
+                raise zipfile.BadZipFile(f"Bad local header for {name!r}")
+            start = info.header_offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+            self.data_offsets[name] = start
+        data = self.reader.read(start, info.compress_size)
+        if len(data) != info.compress_size:
+            raise zipfile.BadZipFile(f"Truncated member {name!r}")
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            data = zlib.decompress(data, -15)
+        if zlib.crc32(data) != info.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {name!r}")
+        return data
+
+    def open(self, name):
+        return io.BytesIO(self.read(name))
+
+    def stats(self):
+        return self.reader.stats()
+
+    def close(self):
+        self.zip.close()
+        self.reader.close()
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that also answers single byte-range requests, which http.server alone does not.
+
+    If-Range is honoured against Last-Modified, so a file replaced since it was opened is answered in full."""
+
+    def send_head(self):
+        range_header = RANGE_HEADER.match(self.headers.get("Range", "").strip())
+        path = self.translate_path(self.path)
+        if range_header is None or not os.path.isfile(path):
+            return super().send_head()
+        if_range = self.headers.get("If-Range")
+        if if_range is not None and if_range != self.date_time_string(os.stat(path).st_mtime):
+            return super().send_head()
+        size = os.path.getsize(path)
+        first, last = range_header.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        elif last:
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            return super().send_head()
+        if start > end or start >= size:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        f = open(path, "rb")
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Last-Modified", self.date_time_string(os.stat(path).st_mtime))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        self.range_length = end - start + 1
+        return f
+
+    def copyfile(self, source, outputfile):
+        length = getattr(self, "range_length", None)
+        if length is None:
+            return super().copyfile(source, outputfile)
+        while length > 0:
+            chunk = source.read(min(length, 64 * 1024))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            length -= len(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read comics over HTTP range requests")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="serve a directory with byte-range support, for testing")
+    serve_parser.add_argument("root")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    fetch_parser = commands.add_parser("fetch", help="open a remote CBZ, read one page and report the transfer")
+    fetch_parser.add_argument("url")
+    fetch_parser.add_argument("--page", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.command == "serve":
+        handler = partial(RangeRequestHandler, directory=args.root)
+        with http.server.ThreadingHTTPServer((args.host, args.port), handler) as server:
+            logging.info("Serving %s on http://%s:%d/", os.path.abspath(args.root), args.host, args.port)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return
+    archive = RemoteZipFile(args.url)
+    try:
+        opened = archive.stats()
+        pages = filter_image_files(archive.namelist(), remote_extension(archive.filename))
+        page = archive.read(pages[args.page - 1])
+        read = archive.stats()
+        print(f"{archive.reader.size} byte archive, {len(pages)} pages")
+        print(f"open: {opened['requests']} requests, {opened['bytes']} bytes")
+        print(f"page {args.page}: {len(page)} bytes; {read['requests']} requests, {read['bytes']} bytes in total")
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+from PIL import Image
+
+from comic_archive import ComicFile
+
+MAX_OPEN_COMICS = 2  # Comics each worker keeps open: the current one and the one before it
+HANDOFF_SEGMENTS = 16  # Segments a Windows worker holds open after returning them, so they last until attached
+SHARED_MODES = {"RGB": "RGBX", "RGBA": "RGBA", "L": "L"}  # Modes Pillow can map straight onto a buffer
+
+# Worker process state
+_comics = OrderedDict()
+_handoff = deque()
+
+
+def default_workers():
+    """One worker per core beyond the one the Tk process needs; 0 on a single core, meaning render in-process."""
+    cores = os.cpu_count() or 1
+    return cores - 1 if cores > 1 else 0
+
+
+def _open_comic(path, identity):
+    key = (path, identity)
+    comic = _comics.get(key)
+    if comic is None:
+        comic = _comics[key] = ComicFile(path, pool_size=1)
+        while len(_comics) > MAX_OPEN_COMICS:
+            _comics.popitem(last=False)[1].close()
+    _comics.move_to_end(key)
+    return comic
+
+
+def _create_segment(size):
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:  # Before Python 3.13
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            # The parent unlinks the segment once it has attached; this worker's tracker must not do it at exit
+            resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+def fit_box(size, box):
+    """Largest size with the same aspect ratio as size that fits inside box."""
+    width, height = size
+    box_width, box_height = box
+    if width / height > box_width / box_height:
+        return box_width, max(1, int(box_width * height / width))
+    return max(1, int(box_height * width / height)), box_height
+
+
+def render_page(path, identity, name, target_width=None, box=None, draft_size=None):
+    """Worker: decode and resize one page into a new shared memory segment; returns (segment name, mode, size).
+
+    The page is resized to target_width, or fitted into box, with LANCZOS as the viewer does in-process."""
+    img = _open_comic(path, identity).load_page(name, draft_size=draft_size)
+    if box is not None:
+        img = img.resize(fit_box(img.size, box), Image.LANCZOS)
+    elif target_width is not None and img.width != target_width:
+        img = img.resize((target_width, max(1, int(target_width * img.height / img.width))), Image.LANCZOS)
+    if img.mode not in SHARED_MODES:
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    mode = SHARED_MODES[img.mode]
+    data = img.tobytes("raw", mode)
+    segment = _create_segment(len(data))
+    segment.buf[:len(data)] = data
+    name = segment.name
+    if os.name == "nt":
+        # Windows frees a segment with its last handle; keep it until the parent has had time to attach
+        _handoff.append(segment)
+        while len(_handoff) > HANDOFF_SEGMENTS:
+            _handoff.popleft().close()
+    else:
+        segment.close()  # The name keeps it alive until the parent unlinks it, without pinning it in this worker
+    return name, mode, img.size
+
+
+class RenderPool:
+    """Worker processes that decode and resize pages into shared memory, handed back as zero-copy images.
+
+    Each worker opens its own handles on the comics it is asked for. A returned image is a read-only view of
+    its segment: the segment is unlinked as soon as it is attached, and its mapping is closed by sweep() once
+    the image has been freed, i.e. evicted from the caches and off the screen."""
+
+    def __init__(self, workers):
+        # Spawned, not forked: a fork of the Tk process would share its X connection and threads
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        self.lock = threading.Lock()
+        self.segments = []
+
+    def render(self, path, identity, name, target_width=None, box=None, draft_size=None):
+        """Render a page in a worker, blocking the calling thread until its image is ready."""
+        future = self.executor.submit(render_page, path, identity, name, target_width, box, draft_size)
+        return self._attach(*future.result())
+
+    def _attach(self, segment_name, mode, size):
+        segment = shared_memory.SharedMemory(name=segment_name)
+        segment.unlink()  # Only the mappings keep it alive from here, so nothing outlives this process
+        img = Image.frombuffer(mode, size, segment.buf, "raw", mode, 0, 1)
+        with self.lock:
+            self._sweep()
+            self.segments.append((weakref.ref(img), segment))
+        return img
+
+    def _sweep(self):
+        alive = []
+        for image_ref, segment in self.segments:
+            if image_ref() is None:
+                try:
+                    segment.close()
+                    continue
+                except BufferError:
+                    pass  # Something still holds a view of the pixels; try again next sweep
+            alive.append((image_ref, segment))
+        self.segments = alive
+
+    def sweep(self):
+        """Close the segments of images that have been freed."""
+        with self.lock:
+            self._sweep()
+
+    def stats(self):
+        with self.lock:
+            return {"segments": len(self.segments), "bytes": sum(segment.size for _, segment in self.segments)}
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with self.lock:
+            self._sweep()
+            if self.segments:
+                logging.debug("%d shared page segments still in use at shutdown", len(self.segments))
@@ -1,69 +1,139 @@
 from tkinter import *
-from tkinter import ttk, filedialog, messagebox
-from PIL import ImageTk, Image
-import tempfile
+from tkinter import ttk, filedialog, messagebox, simpledialog
+from PIL import ImageTk, Image, ImageDraw
 import os
 import io
 import zipfile
 import shutil
-import re
-import rarfile
 import json
 import configparser
 import logging
 import xml.etree.ElementTree as ET
-from pdf2image import convert_from_path
 import threading
-import time
+import queue
+import subprocess
+import sys
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor, wait
+from page_cache import PageCache, ORIGINALS, RENDITIONS, THUMBNAILS, DEFAULT_BUDGET_BYTES, DEFAULT_ORIGINALS_SHARE
+from comic_archive import (
+    PdfDocument, SolidRarArchive, MappedZipFile, rar_backend, is_solid_rar, verify_archive, natural_sort_key,
+    filter_image_files, comic_info_fields, read_fast_index, is_remote, DEFAULT_POOL_SIZE, FAST_CBZ_INDEX
+)
+from library import Library, DEFAULT_LIBRARY_PATH, SORT_COLUMNS
+from reading_state import ReadingState
+from disk_cache import DiskCache, archive_identity, encode_image, PAGE, THUMBNAIL, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+from prefetch import Prefetcher, DEFAULT_WORKERS, DEFAULT_PAGES_AHEAD
+from profiling import Profiler, memory_usage
+from render_pool import RenderPool, default_workers
+from viewport import (
+    FIT_NONE, FIT_WIDTH, FIT_HEIGHT, FIT_PAGE, FIT_MODES, BASE_PAGE_WIDTH, display_scale, bucket_width, is_bucket,
+    snap_width, fit_width
+)
 
 # Global variables
 current_archive = None
+spread_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spread")
+refine_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="refine")
+header_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="header")
+refine_results = queue.Queue()
+refine_futures = []
+refine_polling = False
+display_generation = 0
+display_items = []
+tiled_view = None
+tile_results = queue.Queue()
+tile_polling = False
+tile_refresh_pending = False
+tile_threshold_width = 1870
+
+continuous_mode = False
+strip_view = None
+strip_results = queue.Queue()
+strip_polling = False
+strip_refresh_pending = False
+
+TILE_SIZE = 512
+TILE_MARGIN = 1  # Tiles kept or rendered beyond each edge of the viewport
+STRIP_OVERSCAN = 1.0  # Screen heights kept or rendered above and below the viewport in continuous mode
+ESTIMATED_PAGE_ASPECT = 1.5  # Height over width for strip pages whose size isn't known yet
 image_files = []
+fast_pages = {}  # Page name -> size and embedded thumbnail, from a fast CBZ's index
+page_sizes = {}  # Page name -> size of the page or one of its renditions (only the aspect is used); None if unreadable
+page_size_results = queue.Queue()
+page_size_pending = {}  # Page name -> future reading its header
+page_size_polling = False
 current_page = 0
 cbz_file_path = None
 page_status_label = None
-image_cache = {}
+page_cache = None
+disk_cache = None
+library = None
+current_archive_id = None
+prefetcher = None
+prefetch_pages = DEFAULT_PAGES_AHEAD
+render_pool = None  # Worker processes for decoding and resizing, when render_workers allows more than one core
 zoom_level = 1.0
+fit_mode = FIT_NONE
+fit_mode_var = None
+base_page_width = BASE_PAGE_WIDTH  # Scaled to the display's DPI once the window exists
+canvas_size = (BASE_PAGE_WIDTH, 1400)  # Updated from <Configure>; read by the open worker too
+shown_width = None  # Page width of what show_page last drew
+resize_job = None
+RESIZE_DEBOUNCE = 150  # Milliseconds a resize has to settle before fit modes re-render
 double_page_mode = False
-bookmarks = {}
+reading_state = None
 config = configparser.ConfigParser()
 button_images = []
 comic_info = None
 about_comic_menu = None
 thumbnail_frame = None
 thumbnail_canvas = None
-thumbnails = []
-thumbnail_ids = []
+thumbnails = {}
+thumbnail_ids = {}
 current_thumbnail_border = None
-
-# Setup logging
-logging.basicConfig(filename="spinner_rack.log", level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
-
-def natural_sort_key(s):
-    return [int(c) if c.isdigit() else c.lower() for c in re.split(r'(\d+)', s)]
-
-def show_loading():
+thumbnail_executor = None
+thumbnail_results = queue.Queue()
+thumbnail_pending = {}
+thumbnail_generation = 0
+thumbnail_polling = False
+
+open_job = None  # The open in progress: its generation, path, cancel event and progress window
+open_generation = 0
+open_results = queue.Queue()
+open_workers = []
+open_polling = False
+
+RESUME_STATE_PATH = "spinner_rack_resume.json"
+RESUME_IMAGE_PATH = "spinner_rack_resume.jpg"
+resume_photo = None
+
+THUMB_WIDTH, THUMB_HEIGHT = 100, 150
+THUMB_PADDING = 10
+THUMB_OVERSCAN = 4  # Slots rendered beyond each edge of the visible region
+
+profiler = Profiler()
+profile_overlay_job = None
+PROFILE_OVERLAY_INTERVAL = 500  # Milliseconds between overlay refreshes
+
+# Setup logging; the level comes from log_level in spinner_rack.ini once it has been read
+logging.basicConfig(filename="spinner_rack.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def show_loading(title, on_cancel):
+    """Non-modal progress window; the main window stays usable while a comic opens."""
     loading = Toplevel(root)
     loading.transient(root)
-    loading.geometry("200x100")
+    loading.title(title)
+    loading.geometry("260x110")
     loading_label = ttk.Label(loading, text="Loading...")
-    loading_label.pack(padx=20, pady=20)
-    loading.update()
+    loading_label.pack(padx=20, pady=(20, 10))
+    ttk.Button(loading, text="Cancel", command=on_cancel).pack(pady=(0, 10))
+    loading.protocol("WM_DELETE_WINDOW", on_cancel)
     return loading, loading_label
 
 def parse_comic_info(xml_content):
     try:
-        root = ET.fromstring(xml_content)
-        info = []
-        fields = [
-            "Title", "Series", "Number", "Volume", "Writer", "Penciller",
-            "Inker", "Colorist", "Letterer", "Editor", "Publisher", "Genre",
-            "Summary"
-        ]
-        for field in fields:
-            value = root.find(field)
-            if value is not None and value.text:
-                info.append(f"{field}: {value.text}")
+        info = [f"{field}: {value}" for field, value in comic_info_fields(xml_content).items()]
         return "\n".join(info) if info else "No metadata available."
     except ET.ParseError as e:
         logging.error("Failed to parse ComicInfo.xml: %s", str(e))
@@ -72,280 +142,1028 @@ def parse_comic_info(xml_content):
         logging.error("Unexpected error parsing ComicInfo.xml: %s", str(e))
         return "Error reading ComicInfo.xml metadata."
 
+def open_page_file(img_filename, archive=None):
+    """File object over a page's bytes; stored CBZ members are CRC-checked views of the mapped archive."""
+    archive = current_archive if archive is None else archive
+    if isinstance(archive, MappedZipFile):
+        return archive.open(img_filename)
+    if isinstance(archive, str):
+        return open(os.path.join(archive, img_filename), "rb")
+    return io.BytesIO(archive.read(img_filename))  # RarFile, SolidRarArchive or RemoteZipFile
+
+def pooled_renderer(archive=None):
+    """The render pool if its workers can reopen this archive cheaply themselves: local CBZ and non-solid CBR.
+
+    Solid CBRs would be streamed again by every worker, PDFs already render in poppler processes and remote
+    comics would be fetched again per worker; those keep rendering in this process."""
+    archive = current_archive if archive is None else archive
+    if render_pool is None or archive is None or isinstance(archive, (PdfDocument, SolidRarArchive, str)):
+        return None
+    return None if is_remote(archive.filename) else render_pool
+
+def render_thumbnail(img_filename):
+    thumb = page_cache.get(THUMBNAILS, img_filename)
+    if thumb is not None:
+        return thumb
+    if fast_pages.get(img_filename, {}).get("thumbnail"):
+        with profiler.stage("thumbnail_embedded"):
+            with current_archive.open(fast_pages[img_filename]["thumbnail"]) as thumb_file:
+                thumb = Image.open(thumb_file)
+                thumb.load()
+        page_cache.put(THUMBNAILS, img_filename, thumb)
+        return thumb
+    if disk_cache is not None:
+        thumb = disk_cache.get_image(current_archive_id, THUMBNAIL, img_filename, THUMB_WIDTH)
+        if thumb is not None:
+            page_cache.put(THUMBNAILS, img_filename, thumb)
+            return thumb
+    pool = pooled_renderer()
+    if pool is not None:
+        with profiler.stage("thumbnail_worker"):
+            thumb = pool.render(cbz_file_path, current_archive_id, img_filename, box=(THUMB_WIDTH, THUMB_HEIGHT),
+                                draft_size=(THUMB_WIDTH, THUMB_HEIGHT))
+        page_cache.put(THUMBNAILS, img_filename, thumb)
+        if disk_cache is not None:
+            disk_cache.put_image_async(current_archive_id, THUMBNAIL, img_filename, THUMB_WIDTH, thumb)
+        return thumb
+    if isinstance(current_archive, PdfDocument):
+        with profiler.stage("thumbnail_pdf_render"):
+            img = current_archive.render(img_filename, THUMB_WIDTH)
+    else:
+        with profiler.stage("thumbnail_read"):
+            page_file = open_page_file(img_filename)
+        with profiler.stage("thumbnail_decode"), page_file:
+            img = Image.open(page_file)
+            img.draft("RGB", (THUMB_WIDTH, THUMB_HEIGHT))  # DCT-scaled decode for JPEG pages
+            img.load()
+
+    aspect_ratio = img.width / img.height
+    if aspect_ratio > THUMB_WIDTH / THUMB_HEIGHT:
+        new_width = THUMB_WIDTH
+        new_height = int(THUMB_WIDTH / aspect_ratio)
+    else:
+        new_height = THUMB_HEIGHT
+        new_width = int(THUMB_HEIGHT * aspect_ratio)
+    with profiler.stage("thumbnail_resize"):
+        thumb = img.resize((new_width, new_height), Image.LANCZOS)
+    page_cache.put(THUMBNAILS, img_filename, thumb)
+    if disk_cache is not None:
+        disk_cache.put_image_async(current_archive_id, THUMBNAIL, img_filename, THUMB_WIDTH, thumb)
+    return thumb
+
+def thumbnail_slot_top(index):
+    return THUMB_PADDING + index * (THUMB_HEIGHT + THUMB_PADDING)
+
+@profiler.timed("thumbnail_layout")
 def generate_thumbnails():
-    global thumbnails, thumbnail_ids, current_thumbnail_border
-    thumbnails = []
-    thumbnail_ids = []
+    """Lay out placeholder slots for every page; thumbnails are rendered as they scroll into view."""
+    global thumbnails, thumbnail_ids, current_thumbnail_border, thumbnail_generation
+    cancel_thumbnails()
+    thumbnail_generation += 1
+    thumbnails = {}
+    thumbnail_ids = {}
+    current_thumbnail_border = None
     thumbnail_canvas.delete("all")
 
     if not image_files:
         return
 
-    thumb_width, thumb_height = 100, 150
-    padding = 10
-    y_position = padding
-
-    for i, img_filename in enumerate(image_files):
-        try:
-            if isinstance(current_archive, zipfile.ZipFile):
-                with current_archive.open(img_filename) as img_file:
-                    img = Image.open(img_file)
-                    img.load()
-            elif isinstance(current_archive, rarfile.RarFile):
-                with current_archive.open(img_filename) as img_file:
-                    img = Image.open(img_file)
-                    img.load()
-            else:
-                img_path = os.path.join(current_archive, img_filename)
-                img = Image.open(img_path)
-
-            aspect_ratio = img.width / img.height
-            if aspect_ratio > thumb_width / thumb_height:
-                new_width = thumb_width
-                new_height = int(thumb_width / aspect_ratio)
-            else:
-                new_height = thumb_height
-                new_width = int(thumb_height * aspect_ratio)
-            img = img.resize((new_width, new_height), Image.LANCZOS)
-            thumb = ImageTk.PhotoImage(img)
-            thumbnails.append(thumb)
-
-            x_position = (thumbnail_canvas.winfo_width() - new_width) // 2
-            if x_position < 0:
-                x_position = padding
+    for i in range(len(image_files)):
+        y_position = thumbnail_slot_top(i)
+        tag = f"thumb_{i}"
+        thumbnail_canvas.create_rectangle(
+            THUMB_PADDING, y_position, THUMB_PADDING + THUMB_WIDTH, y_position + THUMB_HEIGHT,
+            outline="dim gray", fill="dark gray", tags=(tag,)
+        )
+        thumbnail_canvas.tag_bind(tag, "<Button-1>", lambda event, page=i: jump_to_page(page))
 
-            thumb_id = thumbnail_canvas.create_image(x_position, y_position, anchor=NW, image=thumb)
-            thumbnail_ids.append(thumb_id)
+    thumbnail_canvas.config(scrollregion=(0, 0, THUMB_WIDTH + 2 * THUMB_PADDING, thumbnail_slot_top(len(image_files))))
+    update_thumbnail_highlight()
+    refresh_visible_thumbnails()
+
+def visible_thumbnail_range():
+    top, bottom = thumbnail_canvas.yview()
+    total_height = thumbnail_slot_top(len(image_files))
+    slot_height = THUMB_HEIGHT + THUMB_PADDING
+    first = max(int(top * total_height) // slot_height - THUMB_OVERSCAN, 0)
+    last = min(int(bottom * total_height) // slot_height + THUMB_OVERSCAN, len(image_files) - 1)
+    return first, last
+
+def refresh_visible_thumbnails():
+    """Render thumbnails near the visible region and recycle the ones that scrolled away."""
+    global thumbnail_polling
+    if not image_files or not thumbnail_frame.winfo_ismapped():
+        return
 
-            thumbnail_canvas.tag_bind(thumb_id, "<Button-1>", lambda event, page=i: jump_to_page(page))
+    first, last = visible_thumbnail_range()
+    for i in list(thumbnail_ids):
+        if not first <= i <= last:
+            thumbnail_canvas.delete(thumbnail_ids.pop(i))
+            thumbnails.pop(i, None)
+    for i, future in list(thumbnail_pending.items()):
+        if not first <= i <= last and future.cancel():
+            del thumbnail_pending[i]
+
+    for i in range(first, last + 1):
+        if i in thumbnail_ids or i in thumbnail_pending:
+            continue
+        future = thumbnail_executor.submit(render_thumbnail, image_files[i])
+        thumbnail_pending[i] = future
+        future.add_done_callback(
+            lambda f, page=i, generation=thumbnail_generation: thumbnail_results.put((generation, page, f))
+        )
+
+    if thumbnail_pending and not thumbnail_polling:
+        thumbnail_polling = True
+        root.after(30, poll_thumbnail_results)
+
+def poll_thumbnail_results():
+    global thumbnail_polling
+    while True:
+        try:
+            generation, i, future = thumbnail_results.get_nowait()
+        except queue.Empty:
+            break
+        if generation != thumbnail_generation or future.cancelled():
+            continue
+        thumbnail_pending.pop(i, None)
+        if future.exception() is not None:
+            logging.error("Failed to generate thumbnail for %s: %s", image_files[i], str(future.exception()))
+            y_position = thumbnail_slot_top(i)
+            thumbnail_canvas.create_text(
+                THUMB_PADDING + THUMB_WIDTH // 2, y_position + THUMB_HEIGHT // 2,
+                text="Unreadable", fill="red", tags=(f"thumb_{i}",)
+            )
+            continue
+        first, last = visible_thumbnail_range()
+        if not first <= i <= last or i in thumbnail_ids:
+            continue
 
-            y_position += new_height + padding
+        with profiler.stage("thumbnail_photoimage"):
+            thumb = ImageTk.PhotoImage(future.result())
+        thumbnails[i] = thumb
+        x_position = THUMB_PADDING + (THUMB_WIDTH - thumb.width()) // 2
+        y_position = thumbnail_slot_top(i) + (THUMB_HEIGHT - thumb.height()) // 2
+        with profiler.stage("thumbnail_draw"):
+            thumbnail_ids[i] = thumbnail_canvas.create_image(
+                x_position, y_position, anchor=NW, image=thumb, tags=(f"thumb_{i}",)
+            )
 
-        except Exception as e:
-            logging.error("Failed to generate thumbnail for %s: %s", img_filename, str(e))
-            continue
+    if current_thumbnail_border is not None:
+        thumbnail_canvas.tag_raise(current_thumbnail_border)
+    if thumbnail_pending:
+        root.after(30, poll_thumbnail_results)
+    else:
+        thumbnail_polling = False
 
-    thumbnail_canvas.config(scrollregion=(0, 0, thumb_width + 2 * padding, y_position))
-    update_thumbnail_highlight()
+def cancel_thumbnails():
+    running = [future for future in thumbnail_pending.values() if not future.cancel()]
+    thumbnail_pending.clear()
+    wait(running)
 
 def update_thumbnail_highlight():
     global current_thumbnail_border
     if current_thumbnail_border is not None:
         thumbnail_canvas.delete(current_thumbnail_border)
+        current_thumbnail_border = None
 
-    if thumbnail_ids and 0 <= current_page < len(thumbnail_ids):
-        thumb_id = thumbnail_ids[current_page]
-        bbox = thumbnail_canvas.bbox(thumb_id)
-        if bbox:
-            x1, y1, x2, y2 = bbox
-            current_thumbnail_border = thumbnail_canvas.create_rectangle(
-                x1 - 2, y1 - 2, x2 + 2, y2 + 2, outline="red", width=2
-            )
+    if image_files and 0 <= current_page < len(image_files) and thumbnail_canvas.find_withtag(f"thumb_{current_page}"):
+        y_position = thumbnail_slot_top(current_page)
+        current_thumbnail_border = thumbnail_canvas.create_rectangle(
+            THUMB_PADDING - 2, y_position - 2, THUMB_PADDING + THUMB_WIDTH + 2, y_position + THUMB_HEIGHT + 2,
+            outline="red", width=2
+        )
 
 def jump_to_page(page):
     global current_page
     current_page = page
+    prefetcher.cancel()
     show_page(current_page)
 
 def toggle_thumbnails():
     """Show or hide the thumbnail sidebar."""
     if thumbnail_frame.winfo_ismapped():
         thumbnail_frame.pack_forget()
+        for thumb_id in thumbnail_ids.values():
+            thumbnail_canvas.delete(thumb_id)
+        thumbnail_ids.clear()
+        thumbnails.clear()
         view_menu.entryconfig(3, label="Show Thumbnails")  # Index 3 corresponds to "Show/Hide Thumbnails"
     else:
         thumbnail_frame.pack(side=LEFT, fill=Y, before=comic_canvas)
-        generate_thumbnails()
+        if not thumbnail_canvas.find_withtag("thumb_0"):
+            generate_thumbnails()
+        else:
+            thumbnail_canvas.update_idletasks()
+            refresh_visible_thumbnails()
         view_menu.entryconfig(3, label="Hide Thumbnails")  # Index 3
 
-def open_archive_and_get_image_files(file_path):
-    global current_archive, image_files, comic_info, about_comic_menu
+class OpenCancelled(Exception):
+    """Raised inside the open worker when the user cancels or picks another file."""
+
+def check_cancelled(cancelled):
+    if cancelled is not None and cancelled():
+        raise OpenCancelled()
+
+@profiler.timed("open")
+def open_archive_and_get_image_files(file_path, page_index=None, cancelled=None):
+    """Open an archive and list its pages without touching Tk or the current comic's globals.
+
+    Runs on the open worker thread; the archive is closed again if opening fails or is cancelled.
+    """
     logging.debug("Opening file: %s", file_path)
 
-    _, file_extension = os.path.splitext(file_path)
+    if is_remote(file_path):
+        from remote_archive import remote_extension  # Imported on first remote open
+        file_extension = remote_extension(file_path)
+        if file_extension != '.cbz':
+            raise RuntimeError(f"Only .cbz comics can be read from a URL, not {file_extension or 'this file'}")
+    else:
+        _, file_extension = os.path.splitext(file_path)
+    archive = None
     image_files = []
+    fast_pages = {}
     comic_info = None
+    has_comic_info = False
+
+    try:
+        if file_extension.lower() == '.cbz':
+            try:
+                # Only the central directory is read here; member CRCs are checked as pages are read
+                if is_remote(file_path):
+                    from remote_archive import RemoteZipFile
+                    # Fetches just the end record and central directory; pages come by range request
+                    archive = RemoteZipFile(file_path, int(config["Settings"]["remote_cache_bytes"]),
+                                            int(config["Settings"]["remote_fetchers"]))
+                else:
+                    archive = MappedZipFile(file_path, int(config["Settings"]["archive_handles"]))
+                all_files = archive.namelist()
+                check_cancelled(cancelled)
+                fast_index = read_fast_index(archive) if FAST_CBZ_INDEX in all_files else None
+                if fast_index is not None:
+                    # Converted by transcode.py: the page list, sizes and thumbnails are precomputed
+                    image_files = [page["name"] for page in fast_index["pages"]]
+                    fast_pages = {page["name"]: dict(page) for page in fast_index["pages"]}
+                    if fast_index.get("thumbnail_size") != [THUMB_WIDTH, THUMB_HEIGHT]:
+                        for page in fast_pages.values():
+                            page.pop("thumbnail", None)
+                else:
+                    image_files = filter_image_files(all_files, file_extension)
+                logging.debug("CBZ has %d members, %d pages", len(all_files), len(image_files))
+                if "ComicInfo.xml" in all_files:
+                    with archive.open("ComicInfo.xml") as xml_file:
+                        xml_content = xml_file.read().decode('utf-8', errors='ignore')
+                        comic_info = parse_comic_info(xml_content)
+                        logging.debug("ComicInfo.xml parsed: %s", comic_info)
+                    has_comic_info = True
+                else:
+                    comic_info = "No ComicInfo.xml found in archive."
+            except OpenCancelled:
+                raise
+            except zipfile.BadZipFile as e:
+                logging.error("BadZipFile error: %s", str(e))
+                raise RuntimeError(f"Invalid .cbz file: {str(e)}")
+            except Exception as e:
+                logging.error("Unexpected error opening CBZ: %s", str(e))
+                raise RuntimeError(f"Failed to open .cbz file: {str(e)}")
+        elif file_extension.lower() == '.cbr':
+            rarfile = rar_backend()
+            try:
+                archive = rarfile.RarFile(file_path)
+                check_cancelled(cancelled)
+                if is_solid_rar(archive):
+                    logging.debug("Solid CBR, streaming members in one pass")
+                    archive = SolidRarArchive(archive)
+                all_files = archive.namelist()
+                image_files = filter_image_files(all_files, file_extension)
+                logging.debug("CBR has %d members, %d pages", len(all_files), len(image_files))
+                if "ComicInfo.xml" in all_files:
+                    if isinstance(archive, SolidRarArchive):
+                        # ComicInfo.xml usually sits at the end of the stream; read it when asked for
+                        comic_info = None
+                    else:
+                        with archive.open("ComicInfo.xml") as xml_file:
+                            xml_content = xml_file.read().decode('utf-8', errors='ignore')
+                            comic_info = parse_comic_info(xml_content)
+                            logging.debug("ComicInfo.xml parsed: %s", comic_info)
+                    has_comic_info = True
+                else:
+                    comic_info = "No ComicInfo.xml found in archive."
+            except rarfile.Error as e:
+                logging.error("RarFile error: %s", str(e))
+                raise RuntimeError(f"Invalid or corrupt .cbr file: {str(e)}")
+        elif file_extension.lower() == '.pdf':
+            try:
+                logging.debug("Opening PDF: %s", file_path)
+                archive = PdfDocument(file_path)
+                image_files = archive.namelist()
+                if not image_files:
+                    raise RuntimeError("PDF has no pages")
+                comic_info = "ComicInfo.xml not applicable for PDF files."
+            except Exception as e:
+                logging.error("PDF processing error: %s", str(e))
+                raise RuntimeError(f"Failed to process PDF: {str(e)}")
+        check_cancelled(cancelled)
+    except BaseException:
+        if archive is not None:
+            archive.close()  # SolidRarArchive also removes the members it has extracted so far
+        raise
+
+    if page_index is not None:
+        image_files = list(page_index)  # From a resume snapshot of this exact file
+    else:
+        image_files = sorted(image_files, key=natural_sort_key)
+
+    return {"archive": archive, "image_files": image_files, "fast_pages": fast_pages,
+            "comic_info": comic_info, "has_comic_info": has_comic_info}
+
+def load_image(img_filename, draft_width=None, archive=None):
+    """Decode a page; with draft_width, JPEGs decode DCT-scaled to no less than that width."""
+    archive = current_archive if archive is None else archive
+    try:
+        if isinstance(archive, PdfDocument):
+            with profiler.stage("pdf_render"):
+                return archive.render(img_filename, draft_width)
+        with profiler.stage("read"):
+            page_file = open_page_file(img_filename, archive)
+        with profiler.stage("decode"), page_file:
+            img = Image.open(page_file)
+            if draft_width:
+                img.draft("RGB", (draft_width, 1))
+            img.load()
+        return img
+    except Exception as e:
+        logging.error("Failed to load image %s: %s", img_filename, str(e))
+        raise RuntimeError(f"Failed to load image: {str(e)}")
+
+def original_image(img_filename):
+    raw_img = page_cache.get(ORIGINALS, img_filename)
+    if raw_img is None:
+        raw_img = load_image(img_filename)
+        page_cache.put(ORIGINALS, img_filename, raw_img)
+        page_sizes[img_filename] = raw_img.size
+    return raw_img
+
+def cached_rendition(img_filename, target_width):
+    cache_key = (img_filename, target_width)
+    img = page_cache.get(RENDITIONS, cache_key)
+    if img is not None:
+        return img
+    if disk_cache is not None and is_bucket(target_width, base_page_width):
+        img = disk_cache.get_image(current_archive_id, PAGE, img_filename, target_width)
+        if img is not None:
+            page_cache.put(RENDITIONS, cache_key, img)
+            page_sizes.setdefault(img_filename, img.size)
+            return img
+    return None
+
+def rescale_cached_bucket(img_filename, target_width):
+    """Derive an in-between width from the narrowest cached bucket rendition wider than it, or None."""
+    widths = sorted(key[1] for key in page_cache.keys(RENDITIONS)
+                    if len(key) == 2 and key[0] == img_filename and key[1] > target_width
+                    and is_bucket(key[1], base_page_width))
+    for width in widths:
+        source = page_cache.get(RENDITIONS, (img_filename, width))
+        if source is not None:
+            return rescale_rendition(img_filename, source, target_width)
+    return None
+
+def rescale_rendition(img_filename, source, target_width):
+    target_height = max(1, int(target_width * source.height / source.width))
+    with profiler.stage("bucket_resize"):
+        img = source.resize((target_width, target_height), Image.LANCZOS)
+    page_cache.put(RENDITIONS, (img_filename, target_width), img)  # Cheap to redo, so never written to disk
+    return img
+
+def get_rendition(img_filename, target_width):
+    img = cached_rendition(img_filename, target_width)
+    if img is not None:
+        return img
+    if not is_bucket(target_width, base_page_width):
+        # Only bucket widths are decoded from the archive; anything in between is scaled down from one
+        img = rescale_cached_bucket(img_filename, target_width)
+        if img is None:
+            img = rescale_rendition(
+                img_filename, get_rendition(img_filename, bucket_width(target_width, base_page_width)), target_width
+            )
+        return img
+    cache_key = (img_filename, target_width)
+    if isinstance(current_archive, PdfDocument):
+        # Poppler rasterizes straight to the display width, so there is no original to keep
+        with profiler.stage("pdf_render"):
+            img = current_archive.render(img_filename, target_width)
+    elif pooled_renderer() is not None:
+        # Decoded and resized in a worker process; the image is a view of the worker's shared memory
+        with profiler.stage("render_worker"):
+            img = render_pool.render(cbz_file_path, current_archive_id, img_filename, target_width)
+    else:
+        raw_img = original_image(img_filename)
+        aspect_ratio = raw_img.width / raw_img.height
+        target_height = int(target_width / aspect_ratio)
+        with profiler.stage("resize"):
+            img = raw_img.resize((target_width, target_height), Image.LANCZOS)
+    page_cache.put(RENDITIONS, cache_key, img)
+    page_sizes.setdefault(img_filename, img.size)
+    if disk_cache is not None:
+        disk_cache.put_image_async(current_archive_id, PAGE, img_filename, target_width, img)
+    return img
+
+def unreadable_page_placeholder(img_filename, target_width):
+    img = Image.new("RGB", (target_width, int(target_width * 1.5)), "#333333")
+    draw = ImageDraw.Draw(img)
+    draw.text((20, 20), f"Page {img_filename} could not be read.\nSee spinner_rack.log for details.", fill="white")
+    return img
+
+@profiler.timed("preview_resize")
+def scale_preview(img, target_width):
+    target_height = max(1, int(target_width * img.height / img.width))
+    return img.resize((target_width, target_height), Image.BILINEAR, reducing_gap=2.0)
+
+def preview_rendition(img_filename, target_width):
+    """Cheap stand-in for a page while its LANCZOS rendition is produced in the background."""
+    # Rescale the closest cached rendition of the same page, e.g. the one from before a zoom step
+    widths = [key[1] for key in page_cache.keys(RENDITIONS) if len(key) == 2 and key[0] == img_filename]
+    if widths:
+        nearest = min(widths, key=lambda width: abs(width - target_width))
+        img = page_cache.get(RENDITIONS, (img_filename, nearest))
+        if img is not None:
+            return scale_preview(img, target_width)
+    raw_img = page_cache.get(ORIGINALS, img_filename)
+    if raw_img is not None:
+        return scale_preview(raw_img, target_width)
+    if not cheap_preview(img_filename):
+        return None
+    img = load_image(img_filename, draft_width=target_width)
+    if img.format != "JPEG":
+        page_cache.put(ORIGINALS, img_filename, img)  # Decoded at full size anyway; keep it for the refinement
+    return scale_preview(img, target_width)
+
+def cheap_preview(img_filename):
+    """Whether a page can be draft-decoded on the Tk thread: a JPEG read from a local CBZ or folder.
+
+    A PDF page is a full poppler render, other formats decode at full size, and CBR or remote members are
+    extracted or fetched first; those wait for the background render behind a placeholder instead."""
+    return (isinstance(current_archive, (MappedZipFile, str))
+            and os.path.splitext(img_filename)[1].lower() in (".jpg", ".jpeg"))
+
+def loading_placeholder(img_filename, target_width):
+    """Blank page shown while a page renders in the background, as tall as the page if its size is known."""
+    size = page_sizes.get(img_filename)
+    if size is None and img_filename in fast_pages:
+        size = fast_pages[img_filename]["width"], fast_pages[img_filename]["height"]
+    aspect = size[1] / size[0] if size else ESTIMATED_PAGE_ASPECT
+    return Image.new("RGB", (target_width, max(1, int(target_width * aspect))), "#333333")
+
+def render_for_display(img_filename, target_width):
+    """Return (image, final): the finished rendition when cached, otherwise a fast preview or a placeholder.
+
+    Nothing here reads more than a local JPEG's draft, so a page turn never waits on a full render."""
+    try:
+        img = cached_rendition(img_filename, target_width)
+        if img is not None:
+            return img, True
+        img = rescale_cached_bucket(img_filename, target_width)
+        if img is not None:
+            return img, True
+        img = preview_rendition(img_filename, target_width)
+        if img is not None:
+            return img, False
+        return loading_placeholder(img_filename, target_width), False
+    except Exception as e:
+        logging.error("Showing placeholder for unreadable page %s: %s", img_filename, str(e))
+        return unreadable_page_placeholder(img_filename, target_width), True
 
-    if file_extension.lower() == '.cbz':
+def refine_page(generation, slot, img_filename, target_width):
+    prefetcher.wait_for(img_filename, target_width)
+    try:
+        img = get_rendition(img_filename, target_width)
+    except Exception as e:
+        logging.error("Showing placeholder for unreadable page %s: %s", img_filename, str(e))
+        img = unreadable_page_placeholder(img_filename, target_width)
+    refine_results.put((generation, slot, img))
+
+def cancel_refinements(wait_running=False):
+    running = [future for future in refine_futures if not future.cancel()]
+    refine_futures.clear()
+    if wait_running:
+        wait(running)
+
+def poll_refinements():
+    """Swap finished LANCZOS renditions in over their previews, dropping any made obsolete."""
+    global refine_polling
+    while True:
         try:
-            current_archive = zipfile.ZipFile(file_path, 'r')
-            if current_archive.testzip() is not None:
-                raise RuntimeError("Corrupt .cbz file detected.")
-            all_files = current_archive.namelist()
-            logging.debug("All files in CBZ: %s", all_files)
-            image_files = [
-                f for f in all_files
-                if f.lower().endswith(('jpg', 'jpeg', 'png'))
-            ]
-            logging.debug("Filtered image files: %s", image_files)
-            if "ComicInfo.xml" in all_files:
-                with current_archive.open("ComicInfo.xml") as xml_file:
-                    xml_content = xml_file.read().decode('utf-8', errors='ignore')
-                    comic_info = parse_comic_info(xml_content)
-                    logging.debug("ComicInfo.xml parsed: %s", comic_info)
-                about_comic_menu.entryconfig("About Comic", state="normal")
-            else:
-                comic_info = "No ComicInfo.xml found in archive."
-                about_comic_menu.entryconfig("About Comic", state="disabled")
-        except zipfile.BadZipFile as e:
-            logging.error("BadZipFile error: %s", str(e))
-            raise RuntimeError(f"Invalid .cbz file: {str(e)}")
-        except Exception as e:
-            logging.error("Unexpected error opening CBZ: %s", str(e))
-            raise RuntimeError(f"Failed to open .cbz file: {str(e)}")
-    elif file_extension.lower() == '.cbr':
+            generation, slot, img = refine_results.get_nowait()
+        except queue.Empty:
+            break
+        if generation != display_generation or slot >= len(display_items):
+            continue
+        with profiler.stage("refine_photoimage"):
+            photo = ImageTk.PhotoImage(img)
+        with profiler.stage("refine_draw"):
+            comic_canvas.itemconfig(display_items[slot], image=photo)
+        globals()[f"display_img_{slot}"] = photo
+        region = [int(float(value)) for value in comic_canvas.cget("scrollregion").split()]
+        if len(region) == 4 and img.height > region[3]:
+            comic_canvas.config(scrollregion=(*region[:3], img.height))  # Taller than its placeholder
+
+    if any(not future.done() for future in refine_futures) or not refine_results.empty():
+        root.after(30, poll_refinements)
+    else:
+        refine_polling = False
+
+def use_tiles(target_width):
+    return (target_width > tile_threshold_width and not continuous_mode
+            and not isinstance(current_archive, PdfDocument))
+
+@profiler.timed("tile_render")
+def render_tile(img_filename, target_width, tx, ty):
+    """Resample just one TILE_SIZE square of a page at target_width straight from the original."""
+    cache_key = (img_filename, target_width, tx, ty)
+    tile = page_cache.get(RENDITIONS, cache_key)
+    if tile is not None:
+        return tile
+    raw_img = original_image(img_filename)
+    scale = raw_img.width / target_width
+    page_height = int(target_width * raw_img.height / raw_img.width)
+    x0, y0 = tx * TILE_SIZE, ty * TILE_SIZE
+    x1, y1 = min(x0 + TILE_SIZE, target_width), min(y0 + TILE_SIZE, page_height)
+    tile = raw_img.resize((x1 - x0, y1 - y0), Image.LANCZOS, box=(x0 * scale, y0 * scale, x1 * scale, y1 * scale))
+    page_cache.put(RENDITIONS, cache_key, tile)
+    return tile
+
+def tiled_page_height(img_filename, target_width):
+    if img_filename in fast_pages:
+        page = fast_pages[img_filename]
+        return int(target_width * page["height"] / page["width"])
+    for key in page_cache.keys(RENDITIONS):
+        if len(key) == 2 and key[0] == img_filename:
+            img = page_cache.get(RENDITIONS, key)
+            if img is not None:
+                return int(target_width * img.height / img.width)
+    raw_img = original_image(img_filename)
+    return int(target_width * raw_img.height / raw_img.width)
+
+def show_tiled_page(img_filenames, target_width):
+    """Lay out pages too large to render whole; tiles are filled in as they enter the viewport."""
+    global tiled_view
+    pages = []
+    for slot, img_filename in enumerate(img_filenames):
         try:
-            current_archive = rarfile.RarFile(file_path)
-            all_files = current_archive.namelist()
-            logging.debug("All files in CBR: %s", all_files)
-            image_files = [
-                f for f in all_files
-                if f.lower().endswith(('jpg', 'jpeg', 'png')) and re.search(r'\d+', f)
-            ]
-            if "ComicInfo.xml" in all_files:
-                with current_archive.open("ComicInfo.xml") as xml_file:
-                    xml_content = xml_file.read().decode('utf-8', errors='ignore')
-                    comic_info = parse_comic_info(xml_content)
-                    logging.debug("ComicInfo.xml parsed: %s", comic_info)
-                about_comic_menu.entryconfig("About Comic", state="normal")
-            else:
-                comic_info = "No ComicInfo.xml found in archive."
-                about_comic_menu.entryconfig("About Comic", state="disabled")
-        except rarfile.Error as e:
-            logging.error("RarFile error: %s", str(e))
-            raise RuntimeError(f"Invalid or corrupt .cbr file: {str(e)}")
-    elif file_extension.lower() == '.pdf':
-        temp_dir = tempfile.mkdtemp()
-        loading, loading_label = show_loading()  # Unpack returned values
+            pages.append((img_filename, slot * target_width, tiled_page_height(img_filename, target_width)))
+        except Exception as e:
+            logging.error("Failed to lay out page %s: %s", img_filename, str(e))
+            pages.append((img_filename, slot * target_width, 0))
+    tiled_view = {
+        "generation": display_generation,
+        "width": target_width,
+        "pages": pages,
+        "items": {},
+        "photos": {},
+        "pending": {},
+    }
+    refresh_tiles()
+    return max(height for _, _, height in pages)
+
+def refresh_tiles():
+    """Render tiles intersecting the viewport and recycle the ones that left it."""
+    global tile_polling, tile_refresh_pending
+    tile_refresh_pending = False
+    if tiled_view is None:
+        return
+    left, top = comic_canvas.canvasx(0), comic_canvas.canvasy(0)
+    right, bottom = left + comic_canvas.winfo_width(), top + comic_canvas.winfo_height()
+    margin = TILE_MARGIN * TILE_SIZE
+    target_width = tiled_view["width"]
+
+    wanted = set()
+    for slot, (img_filename, x_offset, page_height) in enumerate(tiled_view["pages"]):
+        first_tx = max(int((left - margin - x_offset) // TILE_SIZE), 0)
+        last_tx = min(int((right + margin - x_offset) // TILE_SIZE), (target_width - 1) // TILE_SIZE)
+        first_ty = max(int((top - margin) // TILE_SIZE), 0)
+        last_ty = min(int((bottom + margin) // TILE_SIZE), (page_height - 1) // TILE_SIZE)
+        for tx in range(first_tx, last_tx + 1):
+            for ty in range(first_ty, last_ty + 1):
+                wanted.add((slot, tx, ty))
+
+    for tile in list(tiled_view["items"]):
+        if tile not in wanted:
+            comic_canvas.delete(tiled_view["items"].pop(tile))
+            tiled_view["photos"].pop(tile, None)
+    for tile, future in list(tiled_view["pending"].items()):
+        if tile not in wanted and future.cancel():
+            del tiled_view["pending"][tile]
+
+    generation = tiled_view["generation"]
+    for tile in sorted(wanted, key=lambda t: (t[2], t[0], t[1])):
+        if tile in tiled_view["items"] or tile in tiled_view["pending"]:
+            continue
+        slot, tx, ty = tile
+        future = refine_executor.submit(render_tile, tiled_view["pages"][slot][0], target_width, tx, ty)
+        tiled_view["pending"][tile] = future
+        future.add_done_callback(lambda f, tile=tile: tile_results.put((generation, tile, f)))
+
+    if tiled_view["pending"] and not tile_polling:
+        tile_polling = True
+        root.after(30, poll_tiles)
+
+def poll_tiles():
+    global tile_polling
+    while True:
         try:
-            logging.debug("Attempting to convert PDF: %s", file_path)
-            # Determine poppler_path based on platform
-            if os.name == 'nt':  # Windows
-                poppler_path = r'C:\poppler\Library\bin'  # Adjust for your Windows path
-            else:  # Linux
-                poppler_path = '/usr/bin'  # Default Linux path for poppler-utils
-            # Get total pages for progress logging
-            import subprocess
-            page_count = int(subprocess.check_output([os.path.join(poppler_path, 'pdfinfo'), file_path]).decode().split('Pages: ')[1].split('\n')[0])
-            logging.debug("PDF has %d pages", page_count)
-            # Process page by page with timeout and progress
-            def convert_page(page_num):
-                start_time = time.time()
-                img = convert_from_path(file_path, poppler_path=poppler_path, dpi=100, first_page=page_num, last_page=page_num)[0]  # Lower DPI
-                elapsed = time.time() - start_time
-                logging.debug("Converted page %d in %.2f seconds", page_num, elapsed)
-                return img
-            image_files = []
-            for page_num in range(1, page_count + 1):
-                logging.debug("Converting page %d of %d", page_num, page_count)
-                loading_label.config(text=f"Loading page {page_num} of {page_count}...")
-                loading.update()
-                thread = threading.Thread(target=lambda: image_files.append(convert_page(page_num)))
-                thread.start()
-                thread.join(timeout=60)  # 60-second timeout per page
-                if thread.is_alive():
-                    thread.join()  # Cleanup
-                    logging.warning("Page %d conversion timed out", page_num)
-                    break  # Stop on timeout
-            if not image_files:
-                raise RuntimeError("No pages converted")
-            # Save images
-            for i, img in enumerate(image_files):
-                img_path = os.path.join(temp_dir, f"page_{i:03d}.png")
-                img.save(img_path, "PNG")
-                image_files[i] = f"page_{i:03d}.png"  # Update to filename
-            current_archive = temp_dir
-            logging.debug("PDF pages extracted: %s", image_files)
-            comic_info = "ComicInfo.xml not applicable for PDF files."
-            about_comic_menu.entryconfig("About Comic", state="disabled")
-        except (TimeoutError, Exception) as e:
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            logging.error("PDF processing error: %s", str(e))
-            raise RuntimeError(f"Failed to process PDF: {str(e)}")
-        finally:
-            loading.destroy()  # Destroy the loading window directly
-
-    image_files = sorted(image_files, key=natural_sort_key)
-    logging.debug("Sorted image files: %s", image_files)
-    print("Sorted image files:", image_files)
-
-    if thumbnail_frame.winfo_ismapped():
-        generate_thumbnails()
+            generation, tile, future = tile_results.get_nowait()
+        except queue.Empty:
+            break
+        if tiled_view is None or generation != tiled_view["generation"] or future.cancelled():
+            continue
+        tiled_view["pending"].pop(tile, None)
+        if future.exception() is not None:
+            logging.error("Failed to render tile %s: %s", tile, str(future.exception()))
+            continue
+        slot, tx, ty = tile
+        with profiler.stage("tile_photoimage"):
+            photo = ImageTk.PhotoImage(future.result())
+        x_offset = tiled_view["pages"][slot][1]
+        tiled_view["photos"][tile] = photo
+        with profiler.stage("tile_draw"):
+            tiled_view["items"][tile] = comic_canvas.create_image(
+                x_offset + tx * TILE_SIZE, ty * TILE_SIZE, anchor=NW, image=photo
+            )
 
-    return current_archive, image_files
+    if tiled_view is not None and tiled_view["pending"]:
+        root.after(30, poll_tiles)
+    else:
+        tile_polling = False
 
-def show_page(page_number):
-    global display_img, current_img, zoom_level
-    comic_canvas.delete("all")
+def schedule_tile_refresh(*args):
+    global tile_refresh_pending
+    if tiled_view is not None and not tile_refresh_pending:
+        tile_refresh_pending = True
+        root.after_idle(refresh_tiles)
 
-    def load_image(img_filename):
+def cancel_tiles(wait_running=False):
+    global tiled_view
+    if tiled_view is None:
+        return
+    running = [future for future in tiled_view["pending"].values() if not future.cancel()]
+    tiled_view = None
+    if wait_running:
+        wait(running)
+
+def known_page_sizes():
+    """Page sizes available without decoding, from a fast CBZ index, sizes seen so far or cached renditions."""
+    sizes = {name: size for name, size in page_sizes.items() if size is not None}
+    sizes.update((name, (page["width"], page["height"])) for name, page in fast_pages.items())
+    for key in page_cache.keys(RENDITIONS):
+        if len(key) == 2 and key[0] not in sizes:
+            img = page_cache.peek(RENDITIONS, key)  # A size probe, not a use of the rendition
+            if img is not None:
+                sizes[key[0]] = img.size
+    return sizes
+
+def build_strip(target_width):
+    """Stack every page on one virtual canvas; pages are rendered only as they come near the viewport."""
+    global strip_view
+    sizes = known_page_sizes()
+    heights = []
+    for img_filename in image_files:
+        if img_filename in sizes:
+            width, height = sizes[img_filename]
+            heights.append(max(1, int(target_width * height / width)))
+        else:
+            heights.append(int(target_width * ESTIMATED_PAGE_ASPECT))
+    tops = [0]
+    for height in heights[:-1]:
+        tops.append(tops[-1] + height)
+    strip_view = {
+        "generation": display_generation,
+        "width": target_width,
+        "heights": heights,
+        "tops": tops,
+        "last_top": None,
+        "items": {},
+        "photos": {},
+        "pending": {},
+    }
+    comic_canvas.config(scrollregion=(0, 0, target_width, strip_height()))
+
+def strip_height():
+    return strip_view["tops"][-1] + strip_view["heights"][-1]
+
+def scroll_strip_to(page_number):
+    comic_canvas.yview_moveto(strip_view["tops"][page_number] / strip_height())
+    # The page was chosen, not scrolled to; don't let the viewport position override it
+    strip_view["last_top"] = comic_canvas.canvasy(0)
+    refresh_strip()
+
+def render_strip_page(img_filename, target_width):
+    prefetcher.wait_for(img_filename, target_width)
+    try:
+        return get_rendition(img_filename, target_width)
+    except Exception as e:
+        logging.error("Showing placeholder for unreadable page %s: %s", img_filename, str(e))
+        return unreadable_page_placeholder(img_filename, target_width)
+
+def refresh_strip():
+    """Render strip pages near the viewport, recycle the ones that left it and track the current page."""
+    global strip_polling, strip_refresh_pending, current_page
+    strip_refresh_pending = False
+    if strip_view is None:
+        return
+    top = comic_canvas.canvasy(0)
+    view_height = comic_canvas.winfo_height()
+    margin = view_height * STRIP_OVERSCAN
+    tops = strip_view["tops"]
+    first = max(bisect_right(tops, top - margin) - 1, 0)
+    last = max(bisect_left(tops, top + view_height + margin) - 1, first)
+
+    for page in list(strip_view["items"]):
+        if not first <= page <= last:
+            comic_canvas.delete(strip_view["items"].pop(page))
+            strip_view["photos"].pop(page, None)
+    for page, future in list(strip_view["pending"].items()):
+        if not first <= page <= last and future.cancel():
+            del strip_view["pending"][page]
+
+    generation = strip_view["generation"]
+    for page in range(first, last + 1):
+        if page in strip_view["items"] or page in strip_view["pending"]:
+            continue
+        future = refine_executor.submit(render_strip_page, image_files[page], strip_view["width"])
+        strip_view["pending"][page] = future
+        future.add_done_callback(lambda f, page=page: strip_results.put((generation, page, f)))
+
+    if strip_view["pending"] and not strip_polling:
+        strip_polling = True
+        root.after(30, poll_strip)
+
+    if top != strip_view["last_top"]:
+        strip_view["last_top"] = top
+        page = max(bisect_right(tops, top + view_height / 2) - 1, 0)
+        if page != current_page:
+            current_page = page
+            update_page_status(page, strip_view["width"])
+
+def place_strip_page(page, img):
+    """Draw a rendered strip page, shifting the pages below it if its height was only estimated."""
+    delta = img.height - strip_view["heights"][page]
+    if delta:
+        view_top = comic_canvas.canvasy(0)
+        strip_view["heights"][page] = img.height
+        tops = strip_view["tops"]
+        for below in range(page + 1, len(tops)):
+            tops[below] += delta
+        for below, item in strip_view["items"].items():
+            if below > page:
+                comic_canvas.move(item, 0, delta)
+        comic_canvas.config(scrollregion=(0, 0, strip_view["width"], strip_height()))
+        if tops[page] < view_top:
+            # Keep what is on screen still when a page above it turns out taller or shorter than guessed
+            comic_canvas.yview_moveto((view_top + delta) / strip_height())
+    photo = ImageTk.PhotoImage(img)
+    strip_view["photos"][page] = photo
+    strip_view["items"][page] = comic_canvas.create_image(0, strip_view["tops"][page], anchor=NW, image=photo)
+    return delta != 0
+
+def poll_strip():
+    global strip_polling
+    relayout = False
+    while True:
         try:
-            if isinstance(current_archive, zipfile.ZipFile):
-                with current_archive.open(img_filename) as img_file:
-                    img = Image.open(img_file)
-                    img.load()
-            elif isinstance(current_archive, rarfile.RarFile):
-                with current_archive.open(img_filename) as img_file:
-                    img = Image.open(img_file)
-                    img.load()
-            else:
-                img_path = os.path.join(current_archive, img_filename)
-                img = Image.open(img_path)
-            return img
-        except Exception as e:
-            logging.error("Failed to load image %s: %s", img_filename, str(e))
-            raise RuntimeError(f"Failed to load image: {str(e)}")
+            generation, page, future = strip_results.get_nowait()
+        except queue.Empty:
+            break
+        if strip_view is None or generation != strip_view["generation"] or future.cancelled():
+            continue
+        strip_view["pending"].pop(page, None)
+        if future.exception() is not None:
+            logging.error("Failed to render strip page %s: %s", image_files[page], str(future.exception()))
+            continue
+        if page not in strip_view["items"]:
+            with profiler.stage("strip_draw"):
+                relayout = place_strip_page(page, future.result()) or relayout
+
+    if relayout:
+        schedule_strip_refresh()
+    if strip_view is not None and strip_view["pending"]:
+        root.after(30, poll_strip)
+    else:
+        strip_polling = False
 
-    target_width = int(935 * zoom_level)
+def schedule_strip_refresh(*args):
+    global strip_refresh_pending
+    if strip_view is not None and not strip_refresh_pending:
+        strip_refresh_pending = True
+        root.after_idle(refresh_strip)
+
+def cancel_strip(wait_running=False):
+    global strip_view
+    if strip_view is None:
+        return
+    running = [future for future in strip_view["pending"].values() if not future.cancel()]
+    strip_view = None
+    if wait_running:
+        wait(running)
+
+def show_whole_pages(img_filenames, target_width):
+    global refine_polling
     images = []
     positions = []
 
-    if double_page_mode and page_number < len(image_files) - 1:
-        img_filenames = [image_files[page_number], image_files[page_number + 1]]
-        for i, img_filename in enumerate(img_filenames):
-            raw_img = load_image(img_filename)
-            aspect_ratio = raw_img.width / raw_img.height
-            target_height = int(target_width / aspect_ratio)
-            cache_key = (img_filename, target_width)
-            if cache_key in image_cache:
-                img = image_cache[cache_key]
-            else:
-                img = raw_img.resize((target_width, target_height), Image.LANCZOS)
-                image_cache[cache_key] = img
+    # The second half of a spread renders alongside the first on its own archive handle
+    with profiler.stage("render"):
+        spread_futures = [spread_executor.submit(render_for_display, name, target_width) for name in img_filenames[1:]]
+        rendered = [render_for_display(img_filenames[0], target_width)] + [f.result() for f in spread_futures]
+
+    target_height = 0
+    for i, (img, final) in enumerate(rendered):
+        target_height = max(target_height, img.height)
+        with profiler.stage("photoimage"):
             images.append(ImageTk.PhotoImage(img))
-            positions.append((i * target_width, 0))
+        positions.append((i * target_width, 0))
+        if not final:
+            refine_futures.append(
+                refine_executor.submit(refine_page, display_generation, i, img_filenames[i], target_width)
+            )
+
+    with profiler.stage("draw"):
+        for slot, (img, (x, y)) in enumerate(zip(images, positions)):
+            display_items.append(comic_canvas.create_image(x, y, anchor=NW, image=img))
+            globals()[f"display_img_{slot}"] = img
+    if refine_futures and not refine_polling:
+        refine_polling = True
+        root.after(30, poll_refinements)
+    return target_height
+
+def read_page_size(img_filename, archive, known):
+    """A page's size without decoding it: from a fast CBZ index, the PDF's page box or the image header."""
+    if img_filename in known:
+        return known[img_filename]["width"], known[img_filename]["height"]
+    if isinstance(archive, PdfDocument):
+        if archive.page_size is None:
+            raise RuntimeError("PDF has no page size")
+        return archive.page_size
+    with open_page_file(img_filename, archive) as page_file:
+        with Image.open(page_file) as img:
+            return img.size
+
+def page_size(img_filename):
+    """Tk thread: a page of the current comic's size if it is known, otherwise None.
+
+    Reading the header could mean inflating the whole member or a network round trip, so on a miss it is read
+    on the header worker and the view is refitted once it arrives."""
+    if img_filename in page_sizes:
+        return page_sizes[img_filename]
+    size = known_page_sizes().get(img_filename)
+    if size is None and isinstance(current_archive, PdfDocument):
+        size = current_archive.page_size
+    if size is None:
+        raw_img = page_cache.peek(ORIGINALS, img_filename)
+        size = raw_img.size if raw_img is not None else None
+    if size is not None:
+        page_sizes[img_filename] = size
+        return size
+    if img_filename not in page_size_pending:
+        page_size_pending[img_filename] = header_executor.submit(read_page_size_worker, img_filename, current_archive)
+        start_page_size_polling()
+    return None
+
+def read_page_size_worker(img_filename, archive):
+    try:
+        size = read_page_size(img_filename, archive, {})
+    except Exception as e:
+        logging.debug("Reading the size of page %s: %s", img_filename, str(e))
+        size = None
+    page_size_results.put((archive, img_filename, size))
+
+def start_page_size_polling():
+    global page_size_polling
+    if not page_size_polling:
+        page_size_polling = True
+        root.after(30, poll_page_sizes)
+
+def cancel_page_sizes(wait_running=False):
+    running = [future for future in page_size_pending.values() if not future.cancel()]
+    page_size_pending.clear()
+    if wait_running:
+        wait(running)
+
+def poll_page_sizes():
+    """Record page sizes read in the background and refit the view if one of its pages was among them."""
+    global page_size_polling
+    refit = False
+    while True:
+        try:
+            archive, img_filename, size = page_size_results.get_nowait()
+        except queue.Empty:
+            break
+        if archive is not current_archive:
+            continue  # Read for a comic that has since been replaced
+        page_size_pending.pop(img_filename, None)
+        page_sizes[img_filename] = size
+        refit = refit or (size is not None and image_files
+                          and img_filename in view_pages(current_page, double_page_mode and not continuous_mode))
+    if page_size_pending:
+        root.after(30, poll_page_sizes)
     else:
-        img_filename = image_files[page_number]
-        raw_img = load_image(img_filename)
-        aspect_ratio = raw_img.width / raw_img.height
-        target_height = int(target_width / aspect_ratio)
-        cache_key = (img_filename, target_width)
-        if cache_key in image_cache:
-            img = image_cache[cache_key]
+        page_size_polling = False
+    if refit and fit_mode in (FIT_HEIGHT, FIT_PAGE):
+        rerender_after_resize()
+
+def view_pages(page_number, double=None):
+    double = double_page_mode if double is None else double
+    if double and page_number < len(image_files) - 1:
+        return [image_files[page_number], image_files[page_number + 1]]
+    return [image_files[page_number]]
+
+def target_width_for(img_filenames, zoom, continuous=False, archive=None, known=None):
+    """Display width of each page in a view for the current canvas size, fit mode and zoom.
+
+    Widths close to a rendition bucket are snapped onto it; a strip is always fitted by width. Without an
+    archive this is the current comic on the Tk thread, and pages whose size isn't known yet are estimated."""
+    mode = FIT_WIDTH if continuous and fit_mode != FIT_NONE else fit_mode
+    tallest = (1, ESTIMATED_PAGE_ASPECT)
+    if mode in (FIT_HEIGHT, FIT_PAGE):
+        aspects = []
+        for img_filename in img_filenames:
+            try:
+                if archive is None:
+                    size = page_size(img_filename)
+                else:
+                    size = read_page_size(img_filename, archive, fast_pages if known is None else known)
+                if size is not None:
+                    aspects.append(size[1] / size[0])
+            except Exception as e:
+                logging.debug("Estimating the size of page %s: %s", img_filename, str(e))
+        if aspects:
+            tallest = (1, max(aspects))
+    width = fit_width(mode, canvas_size, tallest, len(img_filenames), base_page_width)
+    return snap_width(width * zoom, base_page_width)
+
+@profiler.timed("show_page")
+def show_page(page_number):
+    global display_generation, display_items, shown_width
+    img_filenames = view_pages(page_number, double_page_mode and not continuous_mode)
+    target_width = target_width_for(img_filenames, zoom_level, continuous_mode)
+    shown_width = target_width
+    if continuous_mode and strip_view is not None and strip_view["width"] == target_width:
+        # The strip is already laid out; turning a page just scrolls it
+        scroll_strip_to(page_number)
+        update_page_status(page_number, target_width)
+        return
+
+    comic_canvas.delete("all")
+    display_generation += 1
+    display_items = []
+    cancel_refinements()
+    cancel_tiles()
+    cancel_strip()
+
+    if continuous_mode:
+        build_strip(target_width)
+        scroll_strip_to(page_number)
+    else:
+        if use_tiles(target_width):
+            target_height = show_tiled_page(img_filenames, target_width)
         else:
-            img = raw_img.resize((target_width, target_height), Image.LANCZOS)
-            image_cache[cache_key] = img
-        images.append(ImageTk.PhotoImage(img))
-        positions.append((0, 0))
+            target_height = show_whole_pages(img_filenames, target_width)
+        comic_canvas.config(scrollregion=(0, 0, target_width * (2 if double_page_mode else 1), target_height))
 
-    for img, (x, y) in zip(images, positions):
-        comic_canvas.create_image(x, y, anchor=NW, image=img)
-        globals()[f"display_img_{x}_{y}"] = img
+    update_page_status(page_number, target_width)
+    if profile_overlay_job is not None:
+        draw_profile_overlay()  # The canvas was cleared above
 
-    comic_canvas.config(scrollregion=(0, 0, target_width * (2 if double_page_mode else 1), target_height))
+def update_page_status(page_number, target_width):
     status_bar.config(value=100 * (page_number + 1) / len(image_files))
     status_bar.update_idletasks()
     page_status_label.config(text=f"Page {page_number + 1}{'+' if double_page_mode else ''} of {len(image_files)}")
     page_status_label.update_idletasks()
 
     if cbz_file_path and image_files:
-        bookmarks[cbz_file_path] = page_number
-        try:
-            with open("bookmarks.json", "w") as f:
-                json.dump(bookmarks, f)
-        except Exception as e:
-            logging.error("Failed to save bookmarks: %s", str(e))
+        reading_state.update(cbz_file_path, page=page_number, zoom=zoom_level, double_page=double_page_mode,
+                             continuous=continuous_mode)
 
     update_thumbnail_highlight()
+    schedule_prefetch(page_number, target_width)
+
+def prefetch_page(img_filename, target_width):
+    if use_tiles(target_width):
+        original_image(img_filename)  # Tiles are cut from the original as they scroll into view
+    else:
+        get_rendition(img_filename, target_width)
+
+def schedule_prefetch(page_number, target_width):
+    step = 2 if double_page_mode else 1
+    pages = []
+    for turn in range(1, prefetch_pages + 1):
+        start = page_number + turn * step
+        pages.extend(range(start, start + step))
+    pages.extend(range(max(page_number - step, 0), page_number))
+    names = [image_files[p] for p in pages if p < len(image_files)]
+    if is_remote(cbz_file_path):
+        # Adjacent pages arrive in one coalesced request, the rest concurrently, before the renders ask for them
+        current_archive.prefetch(names)
+    prefetcher.schedule(names, target_width)
 
 def previous_page():
     global current_page
@@ -362,20 +1180,109 @@ def next_page():
 def zoom_in(event=None):
     global zoom_level
     zoom_level = min(zoom_level * 1.2, 3.0)
+    prefetcher.cancel()
     show_page(current_page)
 
 def zoom_out(event=None):
     global zoom_level
     zoom_level = max(zoom_level / 1.2, 0.5)
+    prefetcher.cancel()
     show_page(current_page)
 
+def set_fit_mode(mode=None):
+    """Size pages to the window (fit width, height or page) or to the fixed base width; zoom scales on top."""
+    global fit_mode, zoom_level
+    fit_mode = fit_mode_var.get() if mode is None else mode
+    fit_mode_var.set(fit_mode)
+    zoom_level = 1.0
+    config.set("Settings", "fit_mode", fit_mode)
+    with open("spinner_rack.ini", "w") as f:
+        config.write(f)
+    prefetcher.cancel()
+    if image_files:
+        show_page(current_page)
+
+def on_canvas_configure(event):
+    """Track the canvas size and, in a fit mode, re-render once a resize has stopped for RESIZE_DEBOUNCE ms."""
+    global canvas_size, resize_job
+    canvas_size = (event.width, event.height)
+    if fit_mode == FIT_NONE or not image_files:
+        return
+    if resize_job is not None:
+        root.after_cancel(resize_job)
+    resize_job = root.after(RESIZE_DEBOUNCE, rerender_after_resize)
+
+def rerender_after_resize():
+    global resize_job
+    resize_job = None
+    if not image_files:
+        return
+    img_filenames = view_pages(current_page, double_page_mode and not continuous_mode)
+    if target_width_for(img_filenames, zoom_level, continuous_mode) != shown_width:
+        prefetcher.cancel()
+        show_page(current_page)
+
 def toggle_double_page():
-    global double_page_mode, current_page
+    global double_page_mode, continuous_mode, current_page
     double_page_mode = not double_page_mode
+    if double_page_mode:
+        continuous_mode = False
+    prefetcher.cancel()
     if double_page_mode and current_page % 2 != 0:
         current_page -= 1
     show_page(current_page)
 
+def toggle_continuous_scroll():
+    """Switch between page-at-a-time viewing and one continuous vertical strip."""
+    global continuous_mode, double_page_mode
+    continuous_mode = not continuous_mode
+    if continuous_mode:
+        double_page_mode = False
+    prefetcher.cancel()
+    if image_files:
+        cancel_strip()  # Force a fresh layout at the current page
+        show_page(current_page)
+
+def verify_current_archive(quiet=False):
+    """CRC-check every member of the open comic on a background thread."""
+    if not cbz_file_path:
+        if not quiet:
+            messagebox.showinfo("Verify Archive", "No comic is open.")
+        return
+    if is_remote(cbz_file_path):
+        # Checking every member would download the whole file; each page's CRC is checked as it arrives
+        if not quiet:
+            messagebox.showinfo("Verify Archive", "Remote comics are checked page by page as they are read.")
+        return
+
+    file_path = cbz_file_path
+    result = {}
+
+    def run():
+        try:
+            result["bad_member"] = verify_archive(file_path)
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, name="verify", daemon=True)
+    thread.start()
+
+    def check():
+        if thread.is_alive():
+            root.after(200, check)
+            return
+        name = os.path.basename(file_path)
+        if "error" in result:
+            logging.error("Verification of %s failed: %s", file_path, str(result["error"]))
+            messagebox.showerror("Verify Archive", f"Could not verify {name}: {result['error']}")
+        elif result["bad_member"] is not None:
+            logging.error("Corrupt member %s in %s", result["bad_member"], file_path)
+            messagebox.showerror("Verify Archive", f"{name} failed verification: {result['bad_member']}")
+        elif not quiet:
+            messagebox.showinfo("Verify Archive", f"{name} passed verification.")
+
+    root.after(200, check)
+
 def toggle_fullscreen():
     root.attributes("-fullscreen", not root.attributes("-fullscreen"))
 
@@ -387,52 +1294,222 @@ def toggle_theme():
     with open("spinner_rack.ini", "w") as f:
         config.write(f)
 
-def open_cbz_or_cbr_file():
-    global current_archive, cbz_file_path, image_files, current_page, thumbnails, thumbnail_ids
-    file_path = filedialog.askopenfilename(title="Open Comic Book File", filetypes=[("Comic Book Files", "*.cbz *.cbr *.pdf")])
+def close_archive(archive):
+    if isinstance(archive, str):
+        shutil.rmtree(archive, ignore_errors=True)
+    elif archive is not None:
+        archive.close()
+
+def close_current_archive():
+    global current_archive
+    close_archive(current_archive)
+    current_archive = None
+
+def render_opening_pages(archive, image_files, fast_pages, archive_id, book_state, cancelled):
+    """Worker side: the renditions the first show_page will draw, so they are ready when the comic is swapped in."""
+    zoom = book_state.get("zoom", zoom_level)
+    double = book_state.get("double_page", double_page_mode)
+    continuous = book_state.get("continuous", continuous_mode) and not double
+    page = min(book_state.get("page", 0), len(image_files) - 1)
+    pages = [page, page + 1] if double and not continuous and page < len(image_files) - 1 else [page]
+    target_width = target_width_for([image_files[p] for p in pages], zoom, continuous, archive, fast_pages)
+    if target_width > tile_threshold_width and not continuous and not isinstance(archive, PdfDocument):
+        return {}  # Tiled pages are rendered a viewport at a time
+    bucket = bucket_width(target_width, base_page_width)
+    renditions = {}
+    for page_number in pages:
+        check_cancelled(cancelled)
+        img_filename = image_files[page_number]
+        img = None
+        if disk_cache is not None:
+            img = disk_cache.get_image(archive_id, PAGE, img_filename, bucket)
+        if img is None:
+            pool = pooled_renderer(archive)
+            if pool is not None:
+                with profiler.stage("render_worker"):
+                    img = pool.render(archive.filename, archive_id, img_filename, bucket)
+            else:
+                img = load_image(img_filename, bucket if isinstance(archive, PdfDocument) else None, archive)
+                if img.width != bucket:
+                    with profiler.stage("resize"):
+                        img = img.resize((bucket, int(bucket * img.height / img.width)), Image.LANCZOS)
+            if disk_cache is not None:
+                disk_cache.put_image_async(archive_id, PAGE, img_filename, bucket, img)
+        renditions[(img_filename, bucket)] = img
+        if target_width != bucket:
+            with profiler.stage("bucket_resize"):
+                renditions[(img_filename, target_width)] = img.resize(
+                    (target_width, max(1, int(target_width * img.height / img.width))), Image.LANCZOS
+                )
+    return renditions
+
+def open_comic_worker(job):
+    """Open thread: open the archive and render its first page, posting progress to open_results."""
+    generation, cancelled = job["generation"], job["cancel"].is_set
+    file_path, resume = job["path"], job["resume"]
+    result = None
+    try:
+        open_results.put((generation, "progress", "Reading archive..."))
+        result = open_archive_and_get_image_files(file_path, resume["pages"] if resume else None, cancelled)
+        if not result["image_files"]:
+            raise RuntimeError("No valid image files found in the archive.")
+        result["archive_id"] = result["archive"].identity if is_remote(file_path) else archive_identity(file_path)
+        result["book_state"] = reading_state.get(file_path)
+        result["renditions"] = {}
+        if resume and resume.get("img") is not None:
+            # The page shown at start-up is exactly the rendition show_page would make
+            result["renditions"][(resume["page_name"], resume["width"])] = resume["img"]
+        else:
+            open_results.put((generation, "progress", f"Rendering page {result['book_state'].get('page', 0) + 1}..."))
+            try:
+                result["renditions"] = render_opening_pages(
+                    result["archive"], result["image_files"], result["fast_pages"], result["archive_id"],
+                    result["book_state"], cancelled
+                )
+            except RuntimeError:
+                pass  # show_page draws its placeholder for a page that can't be read
+        check_cancelled(cancelled)
+        open_results.put((generation, "done", result))
+    except OpenCancelled:
+        if result is not None:
+            close_archive(result["archive"])
+        open_results.put((generation, "cancelled", None))
+    except Exception as e:
+        if result is not None:
+            close_archive(result["archive"])
+        if not isinstance(e, RuntimeError):
+            logging.error("Unexpected error opening file %s: %s", file_path, str(e))
+        open_results.put((generation, "error", e))
+
+def poll_open_results():
+    global open_job, open_polling
+    while True:
+        try:
+            generation, kind, payload = open_results.get_nowait()
+        except queue.Empty:
+            break
+        if open_job is None or generation != open_job["generation"]:
+            if kind == "done":
+                close_archive(payload["archive"])  # Finished after it was cancelled or replaced
+            continue
+        if kind == "progress":
+            open_job["label"].config(text=payload)
+            continue
+        job, open_job = open_job, None
+        job["loading"].destroy()
+        if kind == "done":
+            install_opened_comic(job["path"], payload)
+        elif kind == "error":
+            if isinstance(payload, RuntimeError):
+                messagebox.showerror("Error", str(payload))
+            else:
+                messagebox.showerror("Error", f"Unexpected error: {str(payload)}")
+    if open_job is not None or any(worker.is_alive() for worker in open_workers) or not open_results.empty():
+        open_workers[:] = [worker for worker in open_workers if worker.is_alive()]
+        root.after(50, poll_open_results)
+    else:
+        open_workers.clear()
+        open_polling = False
+
+def cancel_open():
+    """Abandon the open in progress; its worker closes whatever it had opened."""
+    global open_job
+    if open_job is None:
+        return
+    open_job["cancel"].set()
+    open_job["loading"].destroy()
+    open_job = None
+
+def install_opened_comic(file_path, result):
+    """Tk thread: replace the current comic with one the open worker has finished opening."""
+    global current_archive, cbz_file_path, image_files, fast_pages, page_sizes, comic_info, current_page
+    global thumbnails, thumbnail_ids, thumbnail_generation
+    global current_archive_id, zoom_level, double_page_mode, continuous_mode
+    try:
+        prefetcher.cancel(wait_running=True)
+        cancel_refinements(wait_running=True)
+        cancel_tiles(wait_running=True)
+        cancel_strip(wait_running=True)
+        cancel_page_sizes(wait_running=True)
+        cancel_thumbnails()
+        close_current_archive()
+        page_cache.clear()
+        if render_pool is not None:
+            render_pool.sweep()  # The old comic's pages are gone from the cache; release their shared memory
+        thumbnail_generation += 1
+        thumbnails = {}
+        thumbnail_ids = {}
+        thumbnail_canvas.delete("all")
+        page_sizes = {}
+
+        current_archive = result["archive"]
+        image_files = result["image_files"]
+        fast_pages = result["fast_pages"]
+        comic_info = result["comic_info"]
+        current_archive_id = result["archive_id"]
+        about_comic_menu.entryconfig("About Comic", state="normal" if result["has_comic_info"] else "disabled")
+        for cache_key, img in result["renditions"].items():
+            page_cache.put(RENDITIONS, cache_key, img)
+            page_sizes.setdefault(cache_key[0], img.size)
+        if thumbnail_frame.winfo_ismapped():
+            generate_thumbnails()
+
+        cbz_file_path = file_path
+        book_state = result["book_state"]
+        zoom_level = book_state.get("zoom", zoom_level)
+        double_page_mode = book_state.get("double_page", double_page_mode)
+        continuous_mode = book_state.get("continuous", continuous_mode) and not double_page_mode
+        current_page = book_state.get("page", 0)
+        show_page(current_page)
+        if (config["Settings"].getboolean("verify_on_open") and not file_path.lower().endswith(".pdf")
+                and not is_remote(file_path)):
+            verify_current_archive(quiet=True)
+    except RuntimeError as e:
+        messagebox.showerror("Error", str(e))
+    except Exception as e:
+        messagebox.showerror("Error", f"Unexpected error: {str(e)}")
+        logging.error("Unexpected error opening file %s: %s", file_path, str(e))
+
+def open_cbz_or_cbr_file(file_path=None, resume=None):
+    """Start opening a comic in the background; the current one stays readable until the new one is ready."""
+    global open_job, open_generation, open_polling
+    if file_path is None:
+        file_path = filedialog.askopenfilename(title="Open Comic Book File", filetypes=[("Comic Book Files", "*.cbz *.cbr *.pdf")])
 
     if file_path:
         logging.debug("Selected file path: %s", file_path)
-        if not os.path.exists(file_path):
+        if is_remote(file_path):
+            pass  # Checked by the open worker's first request
+        elif not os.path.exists(file_path):
             messagebox.showerror("Error", f"File not found: {file_path}")
             return
-        if not os.access(file_path, os.R_OK):
+        elif not os.access(file_path, os.R_OK):
             messagebox.showerror("Error", f"No read permissions for file: {file_path}")
             return
         file_path = str(file_path)
 
-        loading, _ = show_loading()  # Only need loading window, ignore label for now
-        try:
-            if isinstance(current_archive, str):
-                shutil.rmtree(current_archive, ignore_errors=True)
-            elif isinstance(current_archive, (zipfile.ZipFile, rarfile.RarFile)):
-                current_archive.close()
-            image_cache.clear()
-            thumbnails = []
-            thumbnail_ids = []
-            thumbnail_canvas.delete("all")
-
-            current_archive, image_files = open_archive_and_get_image_files(file_path)
-            if not image_files:
-                messagebox.showerror("Error", "No valid image files found in the archive.")
-                if isinstance(current_archive, str):
-                    shutil.rmtree(current_archive, ignore_errors=True)
-                elif isinstance(current_archive, (zipfile.ZipFile, rarfile.RarFile)):
-                    current_archive.close()
-                current_archive = None
-                image_files = []
-                return
-
-            cbz_file_path = file_path
-            current_page = bookmarks.get(file_path, 0)
-            show_page(current_page)
-        except RuntimeError as e:
-            messagebox.showerror("Error", str(e))
-        except Exception as e:
-            messagebox.showerror("Error", f"Unexpected error: {str(e)}")
-            logging.error("Unexpected error opening file %s: %s", file_path, str(e))
-        finally:
-            loading.destroy()
+        cancel_open()  # Choosing another file replaces an open that hasn't finished
+        open_generation += 1
+        loading, loading_label = show_loading(os.path.basename(file_path), cancel_open)
+        open_job = {"generation": open_generation, "path": file_path, "resume": resume,
+                    "cancel": threading.Event(), "loading": loading, "label": loading_label}
+        worker = threading.Thread(target=open_comic_worker, args=(open_job,), name="open", daemon=True)
+        open_workers.append(worker)
+        worker.start()
+        if not open_polling:
+            open_polling = True
+            root.after(50, poll_open_results)
+
+def open_url():
+    """Read a CBZ straight off a file server by HTTP range requests, without copying it down first."""
+    url = simpledialog.askstring("Open URL", "Address of a .cbz file (http:// or https://):", parent=root)
+    if not url:
+        return
+    url = url.strip()
+    if not is_remote(url):
+        messagebox.showerror("Error", f"Not an http:// or https:// address: {url}")
+        return
+    open_cbz_or_cbr_file(url)
 
 #def about():
 #    messagebox.showinfo("About", "Spinner Rack Comic Book Reader\nVersion 1.0\nDeveloped by Rich Lawrence")
@@ -447,7 +1524,91 @@ def about():
     close_button = Button(about_window, text="Close", command=about_window.destroy)
     close_button.pack(pady=10)
 
+def show_library():
+    """Browse and search the catalog; every lookup is an indexed query, not a folder walk."""
+    window = Toplevel(root)
+    window.title("Library")
+    window.geometry("800x600")
+    window.transient(root)
+
+    controls = Frame(window)
+    controls.pack(side=TOP, fill=X, padx=5, pady=5)
+    search_var = StringVar()
+    sort_var = StringVar(value="series")
+    ttk.Label(controls, text="Search:").pack(side=LEFT)
+    search_entry = ttk.Entry(controls, textvariable=search_var, width=30)
+    search_entry.pack(side=LEFT, padx=5)
+    ttk.Label(controls, text="Sort by:").pack(side=LEFT)
+    ttk.Combobox(controls, textvariable=sort_var, values=sorted(SORT_COLUMNS), state="readonly", width=10).pack(side=LEFT, padx=5)
+    status_label = ttk.Label(controls, text="")
+    status_label.pack(side=RIGHT)
+
+    columns = ("series", "number", "title", "writer", "publisher", "pages")
+    tree = ttk.Treeview(window, columns=columns, show="headings")
+    for column in columns:
+        tree.heading(column, text=column.capitalize())
+        tree.column(column, width=60 if column in ("number", "pages") else 150)
+    tree_scrollbar = Scrollbar(window, orient=VERTICAL, command=tree.yview)
+    tree.config(yscrollcommand=tree_scrollbar.set)
+    tree_scrollbar.pack(side=RIGHT, fill=Y)
+    tree.pack(fill=BOTH, expand=True)
+
+    def refresh(*args):
+        tree.delete(*tree.get_children())
+        text = search_var.get().strip() or None
+        for row in library.search(text=text, sort=sort_var.get(), limit=500):
+            tree.insert("", END, iid=row["path"], values=(
+                row["series"] or os.path.basename(row["path"]), row["number"] or "", row["title"] or "",
+                row["writer"] or "", row["publisher"] or "", row["page_count"] or "",
+            ))
+        status_label.config(text=f"{library.count()} comics in library")
+
+    def scan_folder():
+        folder = filedialog.askdirectory(title="Scan Folder Into Library", parent=window)
+        if not folder:
+            return
+        # The scanner's process pool runs in its own interpreter so worker start-up never re-imports this script
+        scanner = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "library.py"),
+             "--db", library.path, "scan", folder],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        progress = {"line": "Scanning..."}
+        thread = threading.Thread(
+            target=lambda: [progress.update(line=line.strip()) for line in scanner.stdout],
+            name="library-scan", daemon=True,
+        )
+        thread.start()
+
+        def check():
+            if thread.is_alive() or scanner.poll() is None:
+                if window.winfo_exists():
+                    status_label.config(text=progress["line"])
+                root.after(250, check)
+            elif scanner.returncode != 0:
+                messagebox.showerror("Library", f"Scanning {folder} failed.")
+            elif window.winfo_exists():
+                refresh()
+
+        check()
+
+    def open_selected(event):
+        selection = tree.selection()
+        if selection:
+            open_cbz_or_cbr_file(selection[0])
+
+    ttk.Button(controls, text="Scan Folder...", command=scan_folder).pack(side=RIGHT, padx=5)
+    search_var.trace_add("write", refresh)
+    sort_var.trace_add("write", refresh)
+    tree.bind("<Double-1>", open_selected)
+    search_entry.focus_set()
+    refresh()
+
 def about_comic():
+    global comic_info
+    if comic_info is None and isinstance(current_archive, SolidRarArchive):
+        with current_archive.open("ComicInfo.xml") as xml_file:
+            comic_info = parse_comic_info(xml_file.read().decode('utf-8', errors='ignore'))
     if comic_info is None:
         messagebox.showinfo("Comic Info", "No comic metadata available.")
         return
@@ -469,156 +1630,386 @@ def about_comic():
     ok_button = Button(popup, text="Close", command=popup.destroy)
     ok_button.pack(pady=5)
 
+def show_cache_stats():
+    lines = []
+    for tier, stats in page_cache.stats().items():
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = 100 * stats["hits"] / lookups if lookups else 0
+        lines.append(
+            f"{tier.capitalize()}: {stats['entries']} entries, "
+            f"{stats['bytes'] / 1048576:.1f} of {stats['budget'] / 1048576:.1f} MB\n"
+            f"  hits {stats['hits']}, misses {stats['misses']} ({hit_rate:.0f}% hit rate), "
+            f"evictions {stats['evictions']}"
+        )
+    messagebox.showinfo("Cache Statistics", "\n\n".join(lines))
+
+def profile_overlay_text():
+    lines = [f"{'stage':<22}{'p50':>8}{'p90':>8}{'p99':>8}{'count':>7}"]
+    for name, stats in profiler.summary().items():
+        lines.append(f"{name:<22}{stats['p50']:>8.1f}{stats['p90']:>8.1f}{stats['p99']:>8.1f}{stats['count']:>7}")
+    lines.append("")
+    caches = dict(page_cache.stats())
+    if disk_cache is not None:
+        caches["disk"] = disk_cache.stats()
+    for tier, stats in caches.items():
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = 100 * stats["hits"] / lookups if lookups else 0
+        size = f", {stats['bytes'] / 1048576:.0f} of {stats['budget'] / 1048576:.0f} MB" if "bytes" in stats else ""
+        lines.append(f"{tier} cache: {hit_rate:.0f}% of {lookups} hits{size}")
+    rss = memory_usage()
+    if rss is not None:
+        lines.append(f"memory: {rss / 1048576:.0f} MB resident")
+    if render_pool is not None:
+        shared = render_pool.stats()
+        lines.append(f"shared pages: {shared['segments']} segments, {shared['bytes'] / 1048576:.0f} MB")
+    return "\n".join(lines)
+
+def draw_profile_overlay():
+    comic_canvas.delete("profile_overlay")
+    x, y = comic_canvas.canvasx(10), comic_canvas.canvasy(10)
+    text = comic_canvas.create_text(
+        x + 6, y + 6, anchor=NW, text=profile_overlay_text(), fill="lime", font=("Courier", 10),
+        tags=("profile_overlay",)
+    )
+    x0, y0, x1, y1 = comic_canvas.bbox(text)
+    background = comic_canvas.create_rectangle(
+        x0 - 6, y0 - 6, x1 + 6, y1 + 6, fill="black", outline="lime", tags=("profile_overlay",)
+    )
+    comic_canvas.tag_lower(background, text)
+
+def refresh_profile_overlay():
+    global profile_overlay_job
+    draw_profile_overlay()
+    profile_overlay_job = root.after(PROFILE_OVERLAY_INTERVAL, refresh_profile_overlay)
+
+def toggle_profile_overlay(event=None):
+    """Show or hide live stage timings, cache hit rates and memory use over the page."""
+    global profile_overlay_job
+    if profile_overlay_job is None:
+        refresh_profile_overlay()
+    else:
+        root.after_cancel(profile_overlay_job)
+        profile_overlay_job = None
+        comic_canvas.delete("profile_overlay")
+
+def export_profile():
+    file_path = filedialog.asksaveasfilename(
+        title="Export Performance Statistics", defaultextension=".jsonl",
+        filetypes=[("JSON Lines", "*.jsonl"), ("All Files", "*.*")]
+    )
+    if not file_path:
+        return
+    caches = dict(page_cache.stats())
+    if disk_cache is not None:
+        caches["disk"] = disk_cache.stats()
+    try:
+        profiler.export_summary(file_path, extra={"caches": caches, "rss_bytes": memory_usage()})
+    except OSError as e:
+        logging.error("Failed to export performance statistics: %s", str(e))
+        messagebox.showerror("Error", f"Could not write {file_path}: {str(e)}")
+
+def write_file_atomically(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def save_resume_snapshot():
+    """Record the open comic's page index and the rendition on screen for resume_last."""
+    target_width = shown_width
+    page_name = image_files[current_page]
+    img = page_cache.get(RENDITIONS, (page_name, target_width))
+    snapshot = {
+        "path": cbz_file_path,
+        "identity": current_archive_id,
+        "page": current_page,
+        "page_name": page_name,
+        "width": target_width,
+        "pages": image_files,
+        "image": img is not None and not double_page_mode and not continuous_mode,
+    }
+    if snapshot["image"]:
+        write_file_atomically(RESUME_IMAGE_PATH, encode_image(img))
+    write_file_atomically(RESUME_STATE_PATH, json.dumps(snapshot).encode("utf-8"))
+
+def resume_last_comic():
+    """Show the snapshot of the last page read straight away, then reopen its comic."""
+    global resume_photo
+    try:
+        with open(RESUME_STATE_PATH, "r") as f:
+            snapshot = json.load(f)
+        if archive_identity(snapshot["path"]) != snapshot["identity"]:
+            return  # Changed or moved since; open it the normal way
+        snapshot["img"] = None
+        if snapshot["image"]:
+            img = Image.open(RESUME_IMAGE_PATH)
+            img.load()
+            snapshot["img"] = img
+            resume_photo = ImageTk.PhotoImage(img)
+            comic_canvas.create_image(0, 0, anchor=NW, image=resume_photo)
+            comic_canvas.config(scrollregion=(0, 0, img.width, img.height))
+        page_count = len(snapshot["pages"])
+        status_bar.config(value=100 * (snapshot["page"] + 1) / page_count)
+        page_status_label.config(text=f"Page {snapshot['page'] + 1} of {page_count}")
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError, KeyError) as e:
+        logging.error("Ignoring resume snapshot: %s", str(e))
+        return
+    root.after(100, lambda: open_cbz_or_cbr_file(snapshot["path"], resume=snapshot))
+
 def on_closing():
     try:
         config.set("Settings", "zoom_level", str(zoom_level))
         with open("spinner_rack.ini", "w") as f:
             config.write(f)
-        with open("bookmarks.json", "w") as f:
-            json.dump(bookmarks, f)
+        reading_state.close()
+        # A remote comic's identity would cost a request on the next start-up, before the window is up
+        if config["Settings"].getboolean("resume_last") and cbz_file_path and image_files and not is_remote(cbz_file_path):
+            save_resume_snapshot()
     except Exception as e:
         logging.error("Error during cleanup: %s", str(e))
-    if isinstance(current_archive, str):
-        shutil.rmtree(current_archive, ignore_errors=True)
-    elif isinstance(current_archive, (zipfile.ZipFile, rarfile.RarFile)):
-        current_archive.close()
+    cancel_open()
+    prefetcher.cancel(wait_running=True)
+    prefetcher.shutdown()
+    cancel_thumbnails()
+    thumbnail_executor.shutdown(wait=False, cancel_futures=True)
+    if disk_cache is not None:
+        disk_cache.close()
+    spread_executor.shutdown(wait=True)
+    refine_executor.shutdown(wait=True, cancel_futures=True)
+    cancel_page_sizes()
+    header_executor.shutdown(wait=True, cancel_futures=True)
+    if render_pool is not None:
+        render_pool.close()
+    close_current_archive()
+    profiler.close()
     root.destroy()
 
-# Initialize configuration
-config.read("spinner_rack.ini")
-if "Settings" not in config:
-    config["Settings"] = {}
-config["Settings"].setdefault("theme", "clam")
-zoom_level = float(config["Settings"].get("zoom_level", "1.0"))
-
-# Load bookmarks
-try:
-    with open("bookmarks.json", "r") as f:
-        bookmarks = json.load(f) if os.path.getsize("bookmarks.json") > 0 else {}
-except (FileNotFoundError, json.JSONDecodeError):
-    bookmarks = {}
-
-root = Tk()
-root.iconphoto(True, PhotoImage(file="Comics.png"))
-root.title('Spinner Rack')
-root.geometry("935x1400")
-
-# Handle window close
-root.protocol("WM_DELETE_WINDOW", on_closing)
-
-# Setup theme
-style = ttk.Style()
-style.theme_use(config["Settings"]["theme"])
-
-# Menu bar
-menu_bar = Menu(root)
-root.config(menu=menu_bar)
-file_menu = Menu(menu_bar, tearoff=0)
-menu_bar.add_cascade(label="File", menu=file_menu)
-file_menu.add_command(label="Open File", command=open_cbz_or_cbr_file)
-file_menu.add_command(label="Toggle Fullscreen", command=toggle_fullscreen)
-file_menu.add_command(label="Toggle Theme", command=toggle_theme)
-file_menu.add_separator()
-file_menu.add_command(label="Exit", command=on_closing)
-view_menu = Menu(menu_bar, tearoff=0)
-menu_bar.add_cascade(label="View", menu=view_menu)
-view_menu.add_command(label="Zoom In", command=zoom_in)
-view_menu.add_command(label="Zoom Out", command=zoom_out)
-view_menu.add_command(label="Toggle Double Page", command=toggle_double_page)
-view_menu.add_command(label="Show/Hide Thumbnails", command=toggle_thumbnails)
-about_menu = Menu(menu_bar, tearoff=0)
-menu_bar.add_cascade(label="About", menu=about_menu)
-about_menu.add_command(label="About", command=about)
-about_menu.add_command(label="About Comic", command=about_comic, state="disabled")
-about_comic_menu = about_menu
-
-# Progress bar and status label
-status_bar = ttk.Progressbar(root, mode='determinate')
-status_bar.pack(side=BOTTOM, fill=X)
-page_status_label = ttk.Label(root, text="", anchor=E, padding=5, font=("Arial", 12), background="black", foreground="white")
-page_status_label.pack(side=BOTTOM, fill=X)
-
-# Buttons with custom images
-top_buttons = Frame(root)
-top_buttons.pack(side=TOP, fill=X)
-
-# Load Previous button image
-prev_img = Image.open("img/previous.png")
-prev_img = prev_img.resize((30, 30), Image.LANCZOS)
-prev_photo = ImageTk.PhotoImage(prev_img)
-button_images.append(prev_photo)
-prev_button = Button(top_buttons, image=prev_photo, command=previous_page)
-prev_button.pack(side=LEFT)
-
-# Other buttons (packed on the left)
-open_button = Button(top_buttons, text="Open File", command=open_cbz_or_cbr_file)
-open_button.pack(side=LEFT)
-zoom_in_button = Button(top_buttons, text="Zoom In", command=zoom_in)
-zoom_in_button.pack(side=LEFT)
-zoom_out_button = Button(top_buttons, text="Zoom Out", command=zoom_out)
-zoom_out_button.pack(side=LEFT)
-double_page_button = Button(top_buttons, text="Double Page", command=toggle_double_page)
-double_page_button.pack(side=LEFT)
-
-# Load Next button image (packed on the right)
-next_img = Image.open("img/next.png")
-next_img = next_img.resize((30, 30), Image.LANCZOS)
-next_photo = ImageTk.PhotoImage(next_img)
-button_images.append(next_photo)
-next_button = Button(top_buttons, image=next_photo, command=next_page)
-next_button.pack(side=RIGHT)
-
-# Thumbnail sidebar
-thumbnail_frame = Frame(root, width=120)
-thumbnail_frame.pack(side=LEFT, fill=Y)
-thumbnail_canvas = Canvas(thumbnail_frame, bg="gray", width=120)
-thumbnail_canvas.pack(side=LEFT, fill=Y, expand=True)
-thumbnail_scrollbar = Scrollbar(thumbnail_frame, orient=VERTICAL, command=thumbnail_canvas.yview)
-thumbnail_scrollbar.pack(side=RIGHT, fill=Y)
-thumbnail_canvas.config(yscrollcommand=thumbnail_scrollbar.set)
-
-# Canvas and scrollbar for main comic view
-comic_canvas = Canvas(root, bg="black")
-comic_canvas.pack(fill=BOTH, expand=True, side=LEFT)
-scrollbar = Scrollbar(root, command=comic_canvas.yview)
-scrollbar.pack(fill=Y, side=RIGHT)
-comic_canvas.config(yscrollcommand=scrollbar.set)
-
-# Mouse wheel scrolling for the main canvas
-def on_mouse_scroll(event):
-    if event.delta:
-        comic_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-    elif event.num == 4:
-        comic_canvas.yview_scroll(-3, "units")
-    elif event.num == 5:
-        comic_canvas.yview_scroll(3, "units")
-
-comic_canvas.bind("<MouseWheel>", on_mouse_scroll)
-comic_canvas.bind("<Button-4>", on_mouse_scroll)
-comic_canvas.bind("<Button-5>", on_mouse_scroll)
-comic_canvas.focus_set()
-
-# Mouse wheel scrolling for the thumbnail canvas
-def on_thumbnail_scroll(event):
-    if event.delta:
-        thumbnail_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-    elif event.num == 4:
-        thumbnail_canvas.yview_scroll(-3, "units")
-    elif event.num == 5:
-        thumbnail_canvas.yview_scroll(3, "units")
-
-thumbnail_canvas.bind("<MouseWheel>", on_thumbnail_scroll)
-thumbnail_canvas.bind("<Button-4>", on_thumbnail_scroll)
-thumbnail_canvas.bind("<Button-5>", on_thumbnail_scroll)
-
-# Keyboard and mouse bindings
-root.bind('<Left>', lambda event: previous_page())
-root.bind('<Right>', lambda event: next_page())
-root.bind('<space>', lambda event: next_page())
-root.bind('<F11>', lambda event: toggle_fullscreen())
-root.bind('<MouseWheel>', lambda event: zoom_in() if event.delta > 0 else zoom_out())
-
-display_img = None
-current_img = None
-
-root.mainloop()
+# Render worker processes are spawned and re-run this script as __mp_main__; only the real start builds the UI
+if __name__ == "__main__":
+    # Initialize configuration
+    config.read("spinner_rack.ini")
+    if "Settings" not in config:
+        config["Settings"] = {}
+    config["Settings"].setdefault("theme", "clam")
+    config["Settings"].setdefault("log_level", "INFO")
+    logging.getLogger().setLevel(config["Settings"]["log_level"].upper())
+    config["Settings"].setdefault("profile_log", "")
+    if config["Settings"]["profile_log"]:
+        profiler.start_export(config["Settings"]["profile_log"])  # One JSON line per timed stage
+    zoom_level = float(config["Settings"].get("zoom_level", "1.0"))
+    config["Settings"].setdefault("fit_mode", FIT_NONE)
+    fit_mode = config["Settings"]["fit_mode"] if config["Settings"]["fit_mode"] in FIT_MODES else FIT_NONE
+    config["Settings"].setdefault("page_cache_bytes", str(DEFAULT_BUDGET_BYTES))
+    config["Settings"].setdefault("page_cache_originals_share", str(DEFAULT_ORIGINALS_SHARE))
+    page_cache = PageCache(
+        int(config["Settings"]["page_cache_bytes"]),
+        float(config["Settings"]["page_cache_originals_share"]),
+    )
+    config["Settings"].setdefault("verify_on_open", "false")
+    config["Settings"].setdefault("resume_last", "false")
+    config["Settings"].setdefault("disk_cache_path", DEFAULT_CACHE_PATH)
+    config["Settings"].setdefault("disk_cache_bytes", str(DEFAULT_MAX_BYTES))
+    if int(config["Settings"]["disk_cache_bytes"]) > 0:
+        try:
+            disk_cache = DiskCache(config["Settings"]["disk_cache_path"], int(config["Settings"]["disk_cache_bytes"]))
+        except Exception as e:
+            logging.error("Disk cache unavailable: %s", str(e))
+    config["Settings"].setdefault("library_path", DEFAULT_LIBRARY_PATH)
+    library = Library(config["Settings"]["library_path"])
+    config["Settings"].setdefault("archive_handles", str(DEFAULT_POOL_SIZE))
+    config["Settings"].setdefault("remote_cache_bytes", str(64 * 1024 * 1024))  # Block cache per remote comic
+    config["Settings"].setdefault("remote_fetchers", "4")  # Range requests in flight at once
+    config["Settings"].setdefault("prefetch_workers", str(DEFAULT_WORKERS))
+    config["Settings"].setdefault("prefetch_pages", str(DEFAULT_PAGES_AHEAD))
+    prefetch_pages = int(config["Settings"]["prefetch_pages"])
+    prefetcher = Prefetcher(prefetch_page, int(config["Settings"]["prefetch_workers"]))
+    config["Settings"].setdefault("tile_threshold_width", str(tile_threshold_width))
+    tile_threshold_width = int(config["Settings"]["tile_threshold_width"])
+    config["Settings"].setdefault("render_workers", "0")  # Worker processes, "auto" for one per spare core
+    render_workers = config["Settings"]["render_workers"].strip().lower()
+    render_workers = default_workers() if render_workers == "auto" else min(int(render_workers), default_workers())
+    if render_workers > 0:
+        render_pool = RenderPool(render_workers)
+    config["Settings"].setdefault("thumbnail_workers", "2")
+    thumbnail_executor = ThreadPoolExecutor(
+        max_workers=max(1, int(config["Settings"]["thumbnail_workers"])), thread_name_prefix="thumbnails"
+    )
+
+    # Bookmarks and per-book view preferences; bookmarks.json is read on first use
+    reading_state = ReadingState()
+
+    if os.name == 'nt':
+        try:
+            import ctypes
+            # Without this Windows reports scaled sizes and stretches every rendition up to the real pixels
+            ctypes.windll.shcore.SetProcessDpiAwareness(1)
+        except (AttributeError, OSError):
+            pass
+
+    root = Tk()
+    root.after(100, lambda: root.iconphoto(True, PhotoImage(file="Comics.png")))  # After the window is up
+    root.title('Spinner Rack')
+    dpi_scale = display_scale(root.winfo_fpixels('1i'))
+    base_page_width = int(BASE_PAGE_WIDTH * dpi_scale)
+    canvas_size = (base_page_width, int(1400 * dpi_scale))
+    root.geometry(f"{base_page_width}x{int(1400 * dpi_scale)}")
+    fit_mode_var = StringVar(value=fit_mode)
+
+    # Handle window close
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+
+    # Setup theme
+    style = ttk.Style()
+    style.theme_use(config["Settings"]["theme"])
+
+    # Menu bar
+    menu_bar = Menu(root)
+    root.config(menu=menu_bar)
+    file_menu = Menu(menu_bar, tearoff=0)
+    menu_bar.add_cascade(label="File", menu=file_menu)
+    file_menu.add_command(label="Open File", command=open_cbz_or_cbr_file)
+    file_menu.add_command(label="Open URL", command=open_url)
+    file_menu.add_command(label="Library", command=show_library)
+    file_menu.add_command(label="Verify Archive", command=verify_current_archive)
+    file_menu.add_command(label="Toggle Fullscreen", command=toggle_fullscreen)
+    file_menu.add_command(label="Toggle Theme", command=toggle_theme)
+    file_menu.add_separator()
+    file_menu.add_command(label="Exit", command=on_closing)
+    view_menu = Menu(menu_bar, tearoff=0)
+    menu_bar.add_cascade(label="View", menu=view_menu)
+    view_menu.add_command(label="Zoom In", command=zoom_in)
+    view_menu.add_command(label="Zoom Out", command=zoom_out)
+    view_menu.add_command(label="Toggle Double Page", command=toggle_double_page)
+    view_menu.add_command(label="Show/Hide Thumbnails", command=toggle_thumbnails)
+    view_menu.add_command(label="Continuous Scroll", command=toggle_continuous_scroll)
+    fit_menu = Menu(view_menu, tearoff=0)
+    view_menu.add_cascade(label="Fit", menu=fit_menu)
+    for label, mode in (("Fixed Width", FIT_NONE), ("Fit Width", FIT_WIDTH), ("Fit Height", FIT_HEIGHT), ("Fit Page", FIT_PAGE)):
+        fit_menu.add_radiobutton(label=label, value=mode, variable=fit_mode_var, command=set_fit_mode)
+    view_menu.add_command(label="Cache Statistics", command=show_cache_stats)
+    view_menu.add_command(label="Performance Overlay", command=toggle_profile_overlay)
+    view_menu.add_command(label="Export Performance Statistics...", command=export_profile)
+    about_menu = Menu(menu_bar, tearoff=0)
+    menu_bar.add_cascade(label="About", menu=about_menu)
+    about_menu.add_command(label="About", command=about)
+    about_menu.add_command(label="About Comic", command=about_comic, state="disabled")
+    about_comic_menu = about_menu
+
+    # Progress bar and status label
+    status_bar = ttk.Progressbar(root, mode='determinate')
+    status_bar.pack(side=BOTTOM, fill=X)
+    page_status_label = ttk.Label(root, text="", anchor=E, padding=5, font=("Arial", 12), background="black", foreground="white")
+    page_status_label.pack(side=BOTTOM, fill=X)
+
+    # Buttons with custom images
+    top_buttons = Frame(root)
+    top_buttons.pack(side=TOP, fill=X)
+
+    # Load Previous button image
+    prev_photo = PhotoImage(file="img/previous.png")  # Tk reads the small icons itself; no Pillow decode or resize
+    button_images.append(prev_photo)
+    prev_button = Button(top_buttons, image=prev_photo, command=previous_page)
+    prev_button.pack(side=LEFT)
+
+    # Other buttons (packed on the left)
+    open_button = Button(top_buttons, text="Open File", command=open_cbz_or_cbr_file)
+    open_button.pack(side=LEFT)
+    zoom_in_button = Button(top_buttons, text="Zoom In", command=zoom_in)
+    zoom_in_button.pack(side=LEFT)
+    zoom_out_button = Button(top_buttons, text="Zoom Out", command=zoom_out)
+    zoom_out_button.pack(side=LEFT)
+    double_page_button = Button(top_buttons, text="Double Page", command=toggle_double_page)
+    double_page_button.pack(side=LEFT)
+
+    # Load Next button image (packed on the right)
+    next_photo = PhotoImage(file="img/next.png")
+    button_images.append(next_photo)
+    next_button = Button(top_buttons, image=next_photo, command=next_page)
+    next_button.pack(side=RIGHT)
+
+    # Thumbnail sidebar
+    thumbnail_frame = Frame(root, width=120)
+    thumbnail_frame.pack(side=LEFT, fill=Y)
+    thumbnail_canvas = Canvas(thumbnail_frame, bg="gray", width=120)
+    thumbnail_canvas.pack(side=LEFT, fill=Y, expand=True)
+    thumbnail_scrollbar = Scrollbar(thumbnail_frame, orient=VERTICAL, command=thumbnail_canvas.yview)
+    thumbnail_scrollbar.pack(side=RIGHT, fill=Y)
+
+    def on_thumbnail_yview(first, last):
+        thumbnail_scrollbar.set(first, last)
+        refresh_visible_thumbnails()
+
+    thumbnail_canvas.config(yscrollcommand=on_thumbnail_yview)
+
+    # Canvas and scrollbar for main comic view
+    comic_canvas = Canvas(root, bg="black")
+    comic_canvas.pack(fill=BOTH, expand=True, side=LEFT)
+    scrollbar = Scrollbar(root, command=comic_canvas.yview)
+    scrollbar.pack(fill=Y, side=RIGHT)
+
+    def on_comic_yview(first, last):
+        scrollbar.set(first, last)
+        schedule_tile_refresh()
+        schedule_strip_refresh()
+
+    comic_canvas.config(yscrollcommand=on_comic_yview, xscrollcommand=schedule_tile_refresh)
+    comic_canvas.bind("<Configure>", schedule_tile_refresh)
+    comic_canvas.bind("<Configure>", schedule_strip_refresh, add="+")
+    comic_canvas.bind("<Configure>", on_canvas_configure, add="+")
+
+    # Mouse wheel scrolling for the main canvas
+    def on_mouse_scroll(event):
+        if event.delta:
+            comic_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        elif event.num == 4:
+            comic_canvas.yview_scroll(-3, "units")
+        elif event.num == 5:
+            comic_canvas.yview_scroll(3, "units")
+
+    def on_mouse_hscroll(event):
+        if event.delta:
+            # Trackpads send deltas under 120; they still scroll at least a unit, in the delta's direction
+            comic_canvas.xview_scroll(int(-1 * (event.delta / 120)) or (-1 if event.delta > 0 else 1), "units")
+        elif event.num == 4:
+            comic_canvas.xview_scroll(-3, "units")
+        elif event.num == 5:
+            comic_canvas.xview_scroll(3, "units")
+
+    comic_canvas.bind("<MouseWheel>", on_mouse_scroll)
+    comic_canvas.bind("<Shift-MouseWheel>", on_mouse_hscroll)
+    comic_canvas.bind("<Shift-Button-4>", on_mouse_hscroll)
+    comic_canvas.bind("<Shift-Button-5>", on_mouse_hscroll)
+    comic_canvas.bind("<Button-4>", on_mouse_scroll)
+    comic_canvas.bind("<Button-5>", on_mouse_scroll)
+    comic_canvas.focus_set()
+
+    # Mouse wheel scrolling for the thumbnail canvas
+    def on_thumbnail_scroll(event):
+        if event.delta:
+            thumbnail_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        elif event.num == 4:
+            thumbnail_canvas.yview_scroll(-3, "units")
+        elif event.num == 5:
+            thumbnail_canvas.yview_scroll(3, "units")
+
+    thumbnail_canvas.bind("<MouseWheel>", on_thumbnail_scroll)
+    thumbnail_canvas.bind("<Button-4>", on_thumbnail_scroll)
+    thumbnail_canvas.bind("<Button-5>", on_thumbnail_scroll)
+
+    # Keyboard and mouse bindings
+    root.bind('<Left>', lambda event: previous_page())
+    root.bind('<Right>', lambda event: next_page())
+    root.bind('<space>', lambda event: next_page())
+    root.bind('<F11>', lambda event: toggle_fullscreen())
+    root.bind('<F12>', toggle_profile_overlay)
+    root.bind('<MouseWheel>', lambda event: zoom_in() if event.delta > 0 else zoom_out())
+
+    display_img = None
+    current_img = None
+
+    if config["Settings"].getboolean("resume_last"):
+        resume_last_comic()
+
+    root.mainloop()
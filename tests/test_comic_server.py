@@ -0,0 +1,130 @@
+import asyncio
+import http.client
+import io
+import json
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from comic_server import ComicServer
+
+PAGE_SIZE = (400, 600)
+
+
+def make_cbz(path, pages=3):
+    with zipfile.ZipFile(path, "w") as archive:
+        for number in range(pages):
+            buffer = io.BytesIO()
+            Image.new("RGB", PAGE_SIZE, (number * 60, 90, 30)).save(buffer, "JPEG")
+            archive.writestr(f"page_{number:02d}.jpg", buffer.getvalue())
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "comics"
+    (root / "series").mkdir(parents=True)
+    make_cbz(root / "series" / "one.cbz")
+    make_cbz(root / "two.cbz", pages=1)
+    make_cbz(tmp_path / "outside.cbz", pages=1)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    comic_server = ComicServer(str(root))
+    host, port = asyncio.run_coroutine_threadsafe(comic_server.start("127.0.0.1", 0), loop).result()
+    comic_server.address = (host, port)
+    yield comic_server
+    asyncio.run_coroutine_threadsafe(comic_server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def get(server, target, headers=None):
+    connection = http.client.HTTPConnection(*server.address, timeout=10)
+    try:
+        connection.request("GET", target, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_listing(server):
+    status, headers, body = get(server, "/comics")
+    assert status == 200
+    assert headers["Content-Type"] == "application/json"
+    assert json.loads(body) == {"total": 2, "offset": 0, "comics": ["series/one.cbz", "two.cbz"]}
+    status, _, body = get(server, "/comics?offset=1&limit=5")
+    assert json.loads(body)["comics"] == ["two.cbz"]
+
+
+def test_pages_and_width(server):
+    status, _, body = get(server, "/comics/series/one.cbz/pages")
+    assert status == 200
+    assert json.loads(body) == {"count": 3, "pages": ["page_00.jpg", "page_01.jpg", "page_02.jpg"]}
+
+    status, headers, body = get(server, "/comics/series/one.cbz/pages/1")
+    assert status == 200
+    assert headers["Content-Type"] == "image/jpeg"
+    assert Image.open(io.BytesIO(body)).size == PAGE_SIZE
+
+    status, headers, body = get(server, "/comics/series/one.cbz/pages/1?width=200")
+    assert status == 200
+    assert Image.open(io.BytesIO(body)).size == (200, 300)
+
+
+@pytest.mark.parametrize("target, expected", [
+    ("/comics?offset=x", 400),
+    ("/comics?limit=ten", 400),
+    ("/comics/series/one.cbz/pages/0?width=wide", 400),
+    ("/comics/series/one.cbz/pages/9", 404),
+    ("/comics/missing.cbz/pages", 404),
+    ("/elsewhere", 404),
+])
+def test_errors(server, target, expected):
+    assert get(server, target)[0] == expected
+
+
+@pytest.mark.parametrize("target", [
+    "/comics/..%2Foutside.cbz/pages",
+    "/comics/series/..%2F..%2Foutside.cbz/pages",
+    "/comics/%2Fetc%2Fpasswd/pages",
+])
+def test_path_traversal_rejected(server, target):
+    assert get(server, target)[0] == 404
+
+
+def test_overlong_header_rejected(server):
+    status, headers, _ = get(server, "/comics", {"X-Padding": "a" * 100000})
+    assert status == 400
+    assert headers["Connection"] == "close"
+
+
+def test_etag_revalidation(server):
+    status, headers, _ = get(server, "/comics/two.cbz/pages/0?width=100")
+    assert status == 200
+    status, _, body = get(server, "/comics/two.cbz/pages/0?width=100", {"If-None-Match": headers["ETag"]})
+    assert status == 304
+    assert body == b""
+
+
+def test_concurrent_requests_share_one_render(server):
+    calls = []
+    render_page = server._render_page
+
+    def slow_render(*args):
+        calls.append(args)
+        time.sleep(0.3)  # Long enough for every request to arrive while the first is rendering
+        return render_page(*args)
+
+    server._render_page = slow_render
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda _: get(server, "/comics/series/one.cbz/pages/2?width=120"), range(4)))
+    assert len(calls) == 1
+    assert {status for status, _, _ in responses} == {200}
+    assert len({body for _, _, body in responses}) == 1
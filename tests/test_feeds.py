@@ -0,0 +1,107 @@
+import io
+import os
+import sqlite3
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+import feeds
+from feeds import FeedBuilder
+from library import Library
+
+COMICS = ("Alpha", "Bravo", "Charlie", "Delta", "Echo")
+
+
+def make_cbz(path, shade=0):
+    buffer = io.BytesIO()
+    Image.new("RGB", (200, 300), (shade, 100, 200)).save(buffer, "JPEG")
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("page_01.jpg", buffer.getvalue())
+
+
+def feed_files(output):
+    files = {}
+    for name in os.listdir(output):
+        if name.endswith(".xml"):
+            with open(os.path.join(output, name), "rb") as f:
+                files[name] = f.read()
+    return files
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    # Covers render on threads so a test can stand in for make_cover
+    monkeypatch.setattr(feeds, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(feeds, "PAGE_SIZE", 2)  # Several pages per feed from a handful of comics
+    root = tmp_path / "comics"
+    root.mkdir()
+    for name in COMICS:
+        make_cbz(root / f"{name}.cbz")
+    library = Library(str(tmp_path / "library.db"))
+    builder = FeedBuilder(library, str(tmp_path / "feeds"))
+    yield root, builder
+    builder.close()
+    library.close()
+
+
+def build(root, builder):
+    return builder.build([str(root)], workers=1)
+
+
+def test_second_build_writes_nothing(setup):
+    root, builder = setup
+    first = build(root, builder)
+    assert first["entries"] == len(COMICS)
+    assert first["written"] > 0
+    second = build(root, builder)
+    assert second == {"updated": 0, "removed": 0, "entries": len(COMICS), "written": 0}
+
+
+def test_touched_comic_rewrites_only_its_pages(setup):
+    root, builder = setup
+    build(root, builder)
+    before = feed_files(builder.output_dir)
+    path = root / "Charlie.cbz"
+    stat = os.stat(path)
+    make_cbz(path, shade=255)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    result = build(root, builder)
+    after = feed_files(builder.output_dir)
+    assert result["updated"] == 1
+    changed = {name for name in after if after[name] != before.get(name)}
+    # The navigation feed carries the newest change overall, so it may be rewritten too
+    assert changed - {"catalog.xml"} == {name for name in after if b"Charlie" in after[name]}
+    assert result["written"] == len(changed)
+    assert any(name.startswith("new-") and name not in changed for name in after)
+
+
+def test_failed_cover_is_retried(setup, monkeypatch):
+    root, builder = setup
+    monkeypatch.setattr(feeds, "make_cover", lambda job: (job[0], "cover page unreadable"))
+    build(root, builder)
+    assert builder.db.execute("SELECT COUNT(*) FROM entries WHERE cover IS NULL").fetchone()[0] == len(COMICS)
+
+    monkeypatch.undo()
+    monkeypatch.setattr(feeds, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(feeds, "PAGE_SIZE", 2)
+    result = build(root, builder)
+    assert result["updated"] == len(COMICS)
+    covers = [cover for cover, in builder.db.execute("SELECT cover FROM entries")]
+    assert None not in covers
+    assert all(os.path.exists(os.path.join(builder.output_dir, feeds.COVERS_DIR, cover)) for cover in covers)
+    assert build(root, builder)["updated"] == 0
+
+
+def test_removed_comic_drops_out(setup):
+    root, builder = setup
+    build(root, builder)
+    os.remove(root / "Delta.cbz")
+    result = build(root, builder)
+    assert result["removed"] == 1
+    assert result["entries"] == len(COMICS) - 1
+    assert not any(b"Delta" in data for data in feed_files(builder.output_dir).values())
+    with sqlite3.connect(os.path.join(builder.output_dir, feeds.STATE_FILE)) as db:
+        assert db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == len(COMICS) - 1
@@ -0,0 +1,81 @@
+import http.server
+import os
+import random
+import threading
+import zipfile
+from functools import partial
+
+import pytest
+
+from remote_archive import BLOCK_SIZE, RangeRequestHandler, RemoteZipFile
+
+PAGES = 12
+PAGE_BYTES = 100 * 1024
+
+
+class QuietHandler(RangeRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def make_cbz(path, seed=0):
+    rng = random.Random(seed)
+    pages = {f"page_{number:02d}.jpg": rng.randbytes(PAGE_BYTES) for number in range(PAGES)}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive:
+        for name, data in pages.items():
+            archive.writestr(name, data)
+    return pages
+
+
+@pytest.fixture
+def served(tmp_path):
+    pages = make_cbz(tmp_path / "comic.cbz")
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(tmp_path)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/comic.cbz", tmp_path / "comic.cbz", pages
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def remote(served):
+    url, _, _ = served
+    archive = RemoteZipFile(url)
+    yield archive
+    archive.close()
+
+
+def test_open_is_one_request(remote):
+    assert remote.stats()["requests"] == 1  # The tail block holds the end record and central directory
+    assert sorted(remote.namelist()) == [f"page_{number:02d}.jpg" for number in range(PAGES)]
+
+
+def test_page_read_is_one_request(served, remote):
+    _, _, pages = served
+    before = remote.stats()["requests"]
+    assert remote.read("page_00.jpg") == pages["page_00.jpg"]
+    assert remote.stats()["requests"] == before + 1
+    assert remote.read("page_00.jpg") == pages["page_00.jpg"]
+    assert remote.stats()["requests"] == before + 1  # Served from the block cache
+
+
+def test_adjacent_pages_coalesced(served, remote):
+    _, _, pages = served
+    names = [f"page_{number:02d}.jpg" for number in range(8)]
+    assert 8 * PAGE_BYTES > 3 * BLOCK_SIZE  # The run spans several blocks
+    before = remote.stats()["requests"]
+    remote.prefetch(names)
+    for name in names:
+        assert remote.read(name) == pages[name]
+    assert remote.stats()["requests"] == before + 1
+
+
+def test_file_changed_on_server(served, remote):
+    _, path, _ = served
+    stat = os.stat(path)
+    make_cbz(path, seed=1)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))  # Last-Modified has whole-second resolution
+    with pytest.raises(RuntimeError, match="changed on the server"):
+        remote.read("page_00.jpg")
@@ -0,0 +1,67 @@
+import gc
+import io
+import os
+import shutil
+import zipfile
+
+import pytest
+from PIL import Image
+
+from render_pool import RenderPool
+
+PAGE_SIZE = (1200, 1800)
+TARGET_WIDTH = 935
+
+
+def make_cbz(path, pages):
+    with zipfile.ZipFile(path, "w") as archive:
+        for number in range(pages):
+            buffer = io.BytesIO()
+            Image.new("RGB", PAGE_SIZE, (number * 40 % 256, 80, 160)).save(buffer, "JPEG")
+            archive.writestr(f"page_{number:02d}.jpg", buffer.getvalue())
+
+
+def shm_used():
+    return shutil.disk_usage("/dev/shm").used
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs a tmpfs /dev/shm")
+def test_shared_memory_stays_bounded(tmp_path):
+    path = str(tmp_path / "comic.cbz")
+    make_cbz(path, 6)
+    pool = RenderPool(2)
+    try:
+        pool.render(path, "id", "page_00.jpg", TARGET_WIDTH)  # Start the workers before measuring
+        gc.collect()
+        pool.sweep()
+        baseline = shm_used()
+        segment_bytes = TARGET_WIDTH * int(TARGET_WIDTH * PAGE_SIZE[1] / PAGE_SIZE[0]) * 4
+        peak = 0
+        for turn in range(40):
+            img = pool.render(path, "id", f"page_{turn % 6:02d}.jpg", TARGET_WIDTH)
+            assert img.size[0] == TARGET_WIDTH
+            del img
+            peak = max(peak, shm_used() - baseline)
+        # Only the last page is still mapped, by the viewer alone; workers keep nothing once they return
+        assert peak <= 3 * segment_bytes
+        gc.collect()
+        pool.sweep()
+        assert pool.stats() == {"segments": 0, "bytes": 0}
+        assert shm_used() - baseline < segment_bytes
+    finally:
+        pool.close()
+
+
+def test_matches_in_process_render(tmp_path):
+    path = str(tmp_path / "comic.cbz")
+    make_cbz(path, 1)
+    with zipfile.ZipFile(path) as archive:
+        original = Image.open(io.BytesIO(archive.read("page_00.jpg"))).convert("RGB")
+    expected = original.resize((TARGET_WIDTH, int(TARGET_WIDTH * original.height / original.width)), Image.LANCZOS)
+    pool = RenderPool(1)
+    try:
+        img = pool.render(path, "id", "page_00.jpg", TARGET_WIDTH)
+        assert img.convert("RGB").tobytes() == expected.tobytes()
+        del img  # Lets close() release the segment rather than leaving it to the garbage collector
+    finally:
+        pool.close()
@@ -0,0 +1,165 @@
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image
+
+from comic_archive import ComicFile, FAST_CBZ_DIR, FAST_CBZ_INDEX, FAST_CBZ_VERSION
+from library import walk_comics
+
+DEFAULT_MAX_WIDTH = 1870  # Widest whole-page rendition the viewer draws before it switches to tiles
+DEFAULT_QUALITY = 90
+THUMB_SIZE = (100, 150)  # Must match the viewer's thumbnail box for the embedded thumbnails to be used
+
+
+def fast_cbz_source(destination):
+    """The source stamp recorded in an existing fast CBZ, or None if it is missing or unreadable."""
+    try:
+        with zipfile.ZipFile(destination) as archive:
+            index = json.loads(archive.read(FAST_CBZ_INDEX))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    return index.get("source") if index.get("version") == FAST_CBZ_VERSION else None
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return {"name": os.path.basename(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def encode_jpeg(img, quality):
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def transcode_page(comic, name, max_width, quality):
+    """Return (page bytes, page size, thumbnail bytes) for one page at no more than max_width."""
+    if comic.extension == ".pdf":
+        img = comic.load_page(name, max_width)
+        data = None
+    else:
+        data = comic.read(name)
+        img = Image.open(io.BytesIO(data))
+        if img.format != "JPEG" or img.width > max_width:
+            data = None  # Re-encode: PNG scans and oversized JPEGs are what make pages slow to decode
+            img.draft("RGB", (max_width, 1))
+        img.load()
+    if img.width > max_width:
+        img = img.resize((max_width, max(1, round(img.height * max_width / img.width))), Image.LANCZOS)
+    if data is None:
+        data = encode_jpeg(img, quality)
+    thumb = img.copy()
+    thumb.thumbnail(THUMB_SIZE, Image.LANCZOS)
+    return data, img.size, encode_jpeg(thumb, quality)
+
+
+def transcode_comic(source, destination, max_width=DEFAULT_MAX_WIDTH, quality=DEFAULT_QUALITY):
+    """Process-pool worker: write source as a fast CBZ, atomically replacing destination."""
+    stamp = source_stamp(source)
+    comic = ComicFile(source, pool_size=1)
+    temp_path = destination + ".part"
+    try:
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        pages = []
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_STORED) as out:
+            digits = max(4, len(str(len(comic.image_files))))
+            for number, name in enumerate(comic.image_files, start=1):
+                data, (width, height), thumb = transcode_page(comic, name, max_width, quality)
+                page_name = f"{number:0{digits}d}.jpg"
+                thumb_name = f"{FAST_CBZ_DIR}thumbnails/{page_name}"
+                # JPEG data does not deflate, so pages and thumbnails are stored for direct reads
+                out.writestr(page_name, data)
+                out.writestr(thumb_name, thumb)
+                pages.append({"name": page_name, "width": width, "height": height, "thumbnail": thumb_name,
+                              "original": name})
+            if "ComicInfo.xml" in comic.archive.namelist():
+                out.writestr("ComicInfo.xml", comic.read("ComicInfo.xml"), zipfile.ZIP_DEFLATED)
+            index = {"version": FAST_CBZ_VERSION, "source": stamp, "max_width": max_width,
+                     "thumbnail_size": list(THUMB_SIZE), "pages": pages}
+            out.writestr(FAST_CBZ_INDEX, json.dumps(index), zipfile.ZIP_DEFLATED)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        comic.close()
+    return len(pages)
+
+
+def find_jobs(sources, output_dir, force=False):
+    """Yield (source, destination) for every comic that has no up-to-date fast CBZ yet.
+
+    Comics that would convert to the same file, such as foo.cbr next to foo.cbz, keep their extension in the
+    output name (foo.cbr.cbz) so two workers never write one destination; a CBZ gets the plain name first."""
+    output_root = os.path.abspath(output_dir)
+    entries = {}
+    for source_root in sources:
+        if os.path.isfile(source_root):
+            found = [(os.path.abspath(source_root), os.path.dirname(os.path.abspath(source_root)))]
+        else:
+            found = [(path, os.path.abspath(source_root)) for path, _, _ in walk_comics(source_root)]
+        for path, base in sorted(found):
+            if os.path.commonpath([output_root, path]) == output_root:
+                continue  # Earlier output inside a source directory
+            entries.setdefault(path, os.path.relpath(path, base))
+
+    taken = set()
+    for path, relative in sorted(entries.items(), key=lambda entry: not entry[0].lower().endswith(".cbz")):
+        for name in (os.path.splitext(relative)[0] + ".cbz", relative + ".cbz"):
+            destination = os.path.join(output_dir, name)
+            if os.path.normcase(destination) not in taken:
+                break
+        else:
+            logging.warning("Skipping %s: another comic already converts to %s", path, destination)
+            continue
+        taken.add(os.path.normcase(destination))
+        if name != os.path.splitext(relative)[0] + ".cbz":
+            logging.warning("%s shares its name with another comic; converting it to %s", path, destination)
+        # Finished outputs are renamed into place, so an existing one with a matching stamp is complete
+        if not force and fast_cbz_source(destination) == source_stamp(path):
+            continue
+        yield path, destination
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert comics into fast CBZ files for Spinner Rack")
+    parser.add_argument("sources", nargs="+", help="comic files or directories to convert")
+    parser.add_argument("output", help="directory for the converted .cbz files")
+    parser.add_argument("--max-width", type=int, default=DEFAULT_MAX_WIDTH, help="widest page to keep, in pixels")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY, help="JPEG quality for re-encoded pages")
+    parser.add_argument("--workers", type=int, default=None, help="conversion processes")
+    parser.add_argument("--force", action="store_true", help="convert again even if the output is up to date")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    jobs = list(find_jobs(args.sources, args.output, args.force))
+    if not jobs:
+        print("Everything is up to date")
+        return
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(transcode_comic, source, destination, args.max_width, args.quality): source
+                   for source, destination in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            source = futures[future]
+            try:
+                print(f"[{done}/{len(jobs)}] {source}: {future.result()} pages", flush=True)
+            except Exception as e:
+                failed += 1
+                logging.error("Failed to convert %s: %s", source, str(e))
+    print(f"{len(jobs) - failed} converted, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import functools
+
+FIT_NONE = "none"
+FIT_WIDTH = "width"
+FIT_HEIGHT = "height"
+FIT_PAGE = "page"
+FIT_MODES = (FIT_NONE, FIT_WIDTH, FIT_HEIGHT, FIT_PAGE)
+
+BASE_PAGE_WIDTH = 935  # Page width at zoom 1.0 without a fit mode, in 96 DPI pixels
+BUCKET_RATIO = 1.2  # Same as a zoom step, so manual zoom lands on buckets
+MIN_BUCKET = 128
+MAX_BUCKET = 16384
+BUCKET_SNAP = 0.02  # Widths this close to a bucket are drawn at the bucket itself
+
+
+def display_scale(pixels_per_inch):
+    """Device pixels per 96 DPI pixel, in quarter steps and never below 1."""
+    return max(1.0, round(pixels_per_inch / 96 * 4) / 4)
+
+
+@functools.lru_cache(maxsize=None)
+def width_buckets(base_width=BASE_PAGE_WIDTH):
+    """Rendition widths that are decoded from the archive: base_width times whole powers of BUCKET_RATIO."""
+    buckets = set()
+    width, step = float(base_width), 0
+    while width >= MIN_BUCKET:
+        buckets.add(round(width))
+        step -= 1
+        width = base_width * BUCKET_RATIO ** step
+    width, step = float(base_width), 0
+    while width <= MAX_BUCKET:
+        buckets.add(round(width))
+        step += 1
+        width = base_width * BUCKET_RATIO ** step
+    return tuple(sorted(buckets))
+
+
+def bucket_width(width, base_width=BASE_PAGE_WIDTH):
+    """The smallest bucket at least as wide as width, so a rendition derived from it is only ever scaled down."""
+    for bucket in width_buckets(base_width):
+        if bucket >= width:
+            return bucket
+    return width_buckets(base_width)[-1]
+
+
+def is_bucket(width, base_width=BASE_PAGE_WIDTH):
+    return width in width_buckets(base_width)
+
+
+def snap_width(width, base_width=BASE_PAGE_WIDTH):
+    """Round width onto a nearby bucket when the difference wouldn't be visible."""
+    width = max(1, int(width))
+    for bucket in width_buckets(base_width):
+        if abs(bucket - width) <= bucket * BUCKET_SNAP:
+            return bucket
+    return width
+
+
+def fit_width(mode, view_size, page_size, pages_across=1, base_width=BASE_PAGE_WIDTH):
+    """Width of each page so that pages_across of them fit the view as the fit mode asks, before zoom."""
+    if mode == FIT_NONE:
+        return base_width
+    view_width, view_height = view_size
+    across_width = max(1, view_width // pages_across)
+    if mode == FIT_WIDTH:
+        return across_width
+    page_width, page_height = page_size
+    height_width = max(1, int(view_height * page_width / page_height))
+    if mode == FIT_HEIGHT:
+        return height_width
+    return min(across_width, height_width)